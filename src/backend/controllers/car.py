@@ -1,73 +1,491 @@
-from models.car import Car, CarCreate, CarFeatures
-from sqlmodel import select, Session
-from typing import List, Optional
+from models.car import (
+    FILTERABLE_FEATURES,
+    BulkItemResult,
+    BulkItemStatus,
+    Car,
+    CarCreate,
+    CarFacets,
+    CarFeatures,
+    CarFilters,
+    ExportFormat,
+    FacetCount,
+    ImageStatus,
+    ImageVariants,
+    RangeFacet,
+    equals_ignore_case,
+    feature_column,
+    feature_equals,
+)
+from models.image import ImageBlob
+from models.inventory import Inventory, utc_now
+from sqlmodel import select, Session, func
+from sqlalchemy import (
+    Float,
+    String,
+    and_,
+    cast,
+    delete,
+    literal,
+    null,
+    or_,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, List, Optional
 from fastapi import HTTPException
-import requests
-from PIL import Image
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import base64
+import csv
+import io
+import json
 from io import BytesIO
+import glob
+import hashlib
+import math
 import os
 import uuid
-from core.config import AppConfig
+from core import db
+from core.config import AppConfig, ImageConfig
+from core.images import (
+    ImageJob,
+    ImagePipeline,
+    ImageProcessingError,
+    PendingImageSweeper,
+)
+from core.logger import logger
+from core.metrics import image_stage_duration
+from core import search as search_index
+from core.cache import listing_cache, listing_flight
+from core.serialization import dumps
+from core.similarity import similarity_index
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Columnas de CarRead que se leen como tuplas (listados y exportación)
+EXPORT_COLUMNS = (
+    "id",
+    "code",
+    "brand",
+    "model",
+    "description",
+    "price",
+    "promotion_price",
+    "km",
+    "year",
+    "image",
+    "image_status",
+    "image_variants",
+    "features",
+)
+
+# Columnas que usa el índice de vehículos similares
+SIMILARITY_COLUMNS = ("id", "code", "brand", "price", "km", "year", "features")
+
+# En CSV las variantes y las características se aplanan en columnas propias
+EXPORT_CSV_HEADER = (
+    *(name for name in EXPORT_COLUMNS if name not in ("image_variants", "features")),
+    "image_srcset_webp",
+    "image_srcset_avif",
+    *CarFeatures.model_fields,
+)
+
+# Opciones de codificación por formato de imagen
+IMAGE_ENCODERS = {
+    "webp": {
+        "format": "WEBP",
+        "quality": ImageConfig.WEBP_QUALITY,
+        "method": ImageConfig.WEBP_METHOD,
+    },
+    "avif": {
+        "format": "AVIF",
+        "quality": ImageConfig.AVIF_QUALITY,
+        "speed": ImageConfig.AVIF_SPEED,
+    },
+}
+
+# Parámetros que cambian el resultado de la conversión: forman parte del hash
+IMAGE_ENCODING_SIGNATURE = json.dumps(
+    {
+        "max_width": ImageConfig.MAX_WIDTH,
+        "widths": ImageConfig.VARIANT_WIDTHS,
+        "formats": ImageConfig.VARIANT_FORMATS,
+        "encoders": IMAGE_ENCODERS,
+    },
+    sort_keys=True,
+).encode()
+
+# Campos de `features` que se agrupan como facetas del catálogo
+FACET_FEATURES = ("fuel_type", "transmission", "body_type")
 
 
 class CarController:
+    # Primera construcción del índice de similares (en segundo plano)
+    _similarity_build: Optional[asyncio.Future] = None
+
     @staticmethod
     def _ensure_images_directory():
         """Asegura que el directorio de imágenes existe"""
         os.makedirs(AppConfig.IMAGES_DIR, exist_ok=True)
 
     @staticmethod
-    def _save_image_to_file(image_bytes: bytes, code: str) -> str:
-        """Guarda la imagen en el sistema de archivos y retorna el nombre del archivo"""
+    def _variant_filename(filename: str, width: int, image_format: str) -> str:
+        """Nombre determinístico de una variante: `<nombre>-<ancho>w.<formato>`"""
+        stem = os.path.splitext(filename)[0]
+        return f"{stem}-{width}w.{image_format}"
+
+    @staticmethod
+    def _resize_to_width(img: "Image.Image", width: int) -> "Image.Image":
+        """Achica la imagen a `width` manteniendo la proporción"""
+        from PIL import Image
+
+        height = max(1, round(img.height * width / img.width))
+        # reducing_gap reduce primero por un factor entero (rápido) y después
+        # termina con LANCZOS
+        return img.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+
+    @staticmethod
+    def _image_filename(image_bytes: bytes) -> str:
+        """
+        Nombre direccionado por contenido: hash de los bytes de origen y de
+        los parámetros de conversión. La misma foto con la misma configuración
+        siempre produce el mismo archivo, así que su URL es inmutable.
+        """
+        digest = hashlib.sha256(IMAGE_ENCODING_SIGNATURE)
+        digest.update(image_bytes)
+        return f"{digest.hexdigest()[:32]}.webp"
+
+    @staticmethod
+    def _write_image(img: "Image.Image", filename: str, options: dict):
+        """Escribe la imagen de forma atómica (archivo temporal + rename)"""
+        filepath = os.path.join(AppConfig.IMAGES_DIR, filename)
+        temp_path = f"{filepath}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            img.save(temp_path, **options)
+            os.replace(temp_path, filepath)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _save_image_to_file(image_bytes: bytes, filename: str) -> dict:
+        """
+        Guarda la imagen en el sistema de archivos junto con sus variantes por
+        ancho (WebP y AVIF) y retorna las variantes generadas.
+        La imagen se decodifica una sola vez: en JPEG `draft` decodifica
+        directamente a escala reducida y cada variante se achica a partir de
+        la anterior, más grande.
+        """
+        # Pillow se importa con la primera imagen, no al iniciar la aplicación
+        from PIL import Image, features
+
         CarController._ensure_images_directory()
 
         try:
-            # Abrir la imagen desde bytes
-            img = Image.open(BytesIO(image_bytes))
-
-            # Convertir a RGB si es necesario (WebP no soporta algunos modos)
-            if img.mode in ("RGBA", "LA", "P"):
-                # Crear fondo blanco para transparencias
-                background = Image.new("RGB", img.size, (255, 255, 255))
-                if img.mode == "P":
-                    img = img.convert("RGBA")
-                background.paste(
-                    img, mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None
-                )
-                img = background
-            elif img.mode != "RGB":
-                img = img.convert("RGB")
+            with image_stage_duration.time(stage="decode"):
+                # Abrir la imagen desde bytes
+                img = Image.open(BytesIO(image_bytes))
+                max_width = ImageConfig.MAX_WIDTH
+                if img.width > max_width:
+                    # Solo tiene efecto en JPEG: decodifica a una escala menor
+                    max_height = math.ceil(img.height * max_width / img.width)
+                    img.draft("RGB", (max_width, max_height))
+                img.load()
 
-            # Generar nombre de archivo único
-            filename = f"{code}_{uuid.uuid4().hex[:8]}.webp"
-            filepath = os.path.join(AppConfig.IMAGES_DIR, filename)
+            with image_stage_duration.time(stage="convert"):
+                # Convertir a RGB si es necesario (WebP no soporta algunos modos)
+                if img.mode in ("RGBA", "LA", "P"):
+                    # Crear fondo blanco para transparencias
+                    background = Image.new("RGB", img.size, (255, 255, 255))
+                    if img.mode == "P":
+                        img = img.convert("RGBA")
+                    background.paste(
+                        img,
+                        mask=img.split()[-1] if img.mode in ("RGBA", "LA") else None,
+                    )
+                    img = background
+                elif img.mode != "RGB":
+                    img = img.convert("RGB")
+
+                if img.width > max_width:
+                    img = CarController._resize_to_width(img, max_width)
 
             # Guardar como WebP con calidad optimizada
-            img.save(filepath, format="WEBP", quality=85, method=6)
+            with image_stage_duration.time(stage="encode_webp"):
+                CarController._write_image(img, filename, IMAGE_ENCODERS["webp"])
 
-            return filename
-        except Exception as e:
-            print(f"Error al guardar imagen: {e}")
-            raise HTTPException(
-                status_code=500, detail=f"Error al procesar la imagen: {str(e)}"
+            # Variantes más chicas que la imagen principal, de mayor a menor
+            formats = [
+                fmt for fmt in ImageConfig.VARIANT_FORMATS if features.check(fmt)
+            ]
+            widths = sorted(
+                (width for width in ImageConfig.VARIANT_WIDTHS if width < img.width),
+                reverse=True,
             )
+            variant = img
+            for width in widths:
+                with image_stage_duration.time(stage="resize"):
+                    variant = CarController._resize_to_width(variant, width)
+                for image_format in formats:
+                    variant_name = CarController._variant_filename(
+                        filename, width, image_format
+                    )
+                    with image_stage_duration.time(stage=f"encode_{image_format}"):
+                        CarController._write_image(
+                            variant, variant_name, IMAGE_ENCODERS[image_format]
+                        )
+
+            return {"width": img.width, "widths": widths[::-1], "formats": formats}
+        except Exception as e:
+            logger.error(f"Error al guardar imagen: {e}")
+            raise ImageProcessingError(f"Error al procesar la imagen: {str(e)}") from e
 
     @staticmethod
     def _delete_image_file(filename: str):
-        """Elimina una imagen del sistema de archivos"""
+        """Elimina una imagen (y sus variantes) del sistema de archivos"""
         if filename:
-            filepath = os.path.join(AppConfig.IMAGES_DIR, filename)
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    print(f"Error al eliminar imagen {filename}: {e}")
+            stem = os.path.splitext(filename)[0]
+            filepaths = [os.path.join(AppConfig.IMAGES_DIR, filename)]
+            filepaths += glob.glob(os.path.join(AppConfig.IMAGES_DIR, f"{stem}-*w.*"))
+            for filepath in filepaths:
+                if os.path.exists(filepath):
+                    try:
+                        os.remove(filepath)
+                    except Exception as e:
+                        logger.error(f"Error al eliminar imagen {filepath}: {e}")
+
+    @staticmethod
+    def _build_srcset(filename: str, variants: dict) -> ImageVariants:
+        """Arma los `srcset` por formato a partir de las variantes guardadas"""
+        srcset = {}
+        for image_format in variants.get("formats", []):
+            candidates = [
+                f"{AppConfig.IMAGES_URL}/"
+                f"{CarController._variant_filename(filename, width, image_format)}"
+                f" {width}w"
+                for width in variants.get("widths", [])
+            ]
+            if image_format == "webp":
+                # La imagen principal también es WebP
+                candidates.append(
+                    f"{AppConfig.IMAGES_URL}/{filename} {variants['width']}w"
+                )
+            if candidates:
+                srcset[image_format] = ", ".join(candidates)
+        return ImageVariants(**srcset, widths=variants.get("widths", []))
+
+    @staticmethod
+    def _retain_image(filename: str) -> Optional[ImageBlob]:
+        """
+        Suma una referencia a la imagen (creando su registro si no existe) y
+        devuelve el registro previo, o None si la imagen es nueva.
+        """
+        with Session(db.engine, expire_on_commit=False) as session:
+            # Leer y sumar en una sola sentencia: si el registro se borró
+            # (la imagen se liberó) no se actualiza nada y se crea de nuevo
+            blob = session.exec(
+                update(ImageBlob)
+                .where(ImageBlob.filename == filename)
+                .values(refcount=ImageBlob.refcount + 1)
+                .returning(ImageBlob)
+            ).scalar()
+            if blob is not None:
+                session.commit()
+                return blob
+            try:
+                session.add(ImageBlob(filename=filename, refcount=1))
+                session.commit()
+            except IntegrityError:
+                # Otro trabajo registró la misma imagen al mismo tiempo
+                session.rollback()
+                return CarController._retain_image(filename)
+            return None
+
+    @staticmethod
+    def _release_image(filename: Optional[str]):
+        """Resta una referencia a la imagen y borra sus archivos al llegar a cero"""
+        if not filename:
+            return
+        with Session(db.engine) as session:
+            result = session.exec(
+                update(ImageBlob)
+                .where(ImageBlob.filename == filename)
+                .values(refcount=ImageBlob.refcount - 1)
+            )
+            if result.rowcount == 0:
+                # Las imágenes anteriores al almacenamiento por contenido no
+                # tienen registro: se borran como antes
+                unused = True
+            else:
+                # Solo quien borra el registro borra los archivos
+                result = session.exec(
+                    delete(ImageBlob).where(
+                        ImageBlob.filename == filename, ImageBlob.refcount <= 0
+                    )
+                )
+                unused = result.rowcount > 0
+            if unused:
+                # Antes de confirmar: mientras la transacción está abierta, una
+                # nueva referencia a la imagen espera y vuelve a crear los
+                # archivos después de este borrado
+                CarController._delete_image_file(filename)
+            session.commit()
+
+    @staticmethod
+    def _process_image(job: ImageJob, image_bytes: bytes) -> tuple[str, dict]:
+        """
+        Convierte la imagen descargada (se ejecuta en el pool del pipeline).
+        Si la misma imagen ya estaba guardada se reutiliza sin volver a
+        convertirla. La referencia se toma acá para que la imagen no se borre
+        antes de asociarla al vehículo.
+        """
+        filename = CarController._image_filename(image_bytes)
+        blob = CarController._retain_image(filename)
+        filepath = os.path.join(AppConfig.IMAGES_DIR, filename)
+        if blob and blob.variants is not None and os.path.exists(filepath):
+            return filename, blob.variants
+        try:
+            variants = CarController._save_image_to_file(image_bytes, filename)
+            with Session(db.engine) as session:
+                session.exec(
+                    update(ImageBlob)
+                    .where(ImageBlob.filename == filename)
+                    .values(variants=variants)
+                )
+                session.commit()
+        except Exception:
+            CarController._release_image(filename)
+            raise
+        return filename, variants
+
+    @staticmethod
+    def _attach_image(
+        job: ImageJob, result: Optional[tuple[str, dict]], error: Optional[str]
+    ):
+        """Asocia al vehículo la imagen procesada (o registra el error)"""
+        filename, variants = result or (None, None)
+        attached = False
+        try:
+            with Session(db.engine) as session:
+                car = session.get(Car, job.car_id)
+                if car and car.image_source == job.source:
+                    old_image = car.image
+                    if filename:
+                        car.image = filename
+                        car.image_variants = variants
+                        car.image_status = ImageStatus.READY
+                        car.image_error = None
+                    else:
+                        car.image_status = ImageStatus.FAILED
+                        car.image_error = error
+                    car.image_claimed_until = None
+                    session.add(car)
+                    revision = CarController._bump_revision_sync(session)
+                    session.commit()
+                    attached = True
+        except Exception:
+            # La imagen no quedó asociada: se libera la referencia que tomó
+            # `_process_image`, así sus archivos pueden borrarse
+            CarController._release_image(filename)
+            raise
+        if not attached:
+            # El vehículo se eliminó o su imagen cambió mientras se procesaba
+            CarController._release_image(filename)
+            return
+        listing_cache.invalidate()
+        # La imagen no cambia el índice de similares, pero sí la revisión
+        similarity_index.advance(revision)
+        if filename and old_image:
+            # Si es la misma imagen se libera la referencia duplicada
+            CarController._release_image(old_image)
+
+    @staticmethod
+    def _enqueue_image(car: Car):
+        """Encola la descarga y conversión de la imagen del vehículo"""
+        image_pipeline.submit(
+            ImageJob(car_id=car.id, code=car.code, source=car.image_source)
+        )
+
+    @staticmethod
+    def _image_claim() -> datetime:
+        """Vencimiento de la reserva de una imagen que se encola ahora"""
+        return utc_now() + timedelta(seconds=ImageConfig.CLAIM_TIMEOUT)
+
+    @staticmethod
+    def resume_pending_images(session: Session) -> int:
+        """
+        Reserva y vuelve a encolar las imágenes pendientes sin reserva vigente
+        (p. ej. tras un reinicio o si el proceso que las tenía terminó). La
+        condición se repite en el UPDATE: si otro proceso las reservó primero,
+        no se devuelven y no se encolan dos veces.
+        """
+        due = and_(
+            Car.image_status == ImageStatus.PENDING,
+            or_(
+                Car.image_claimed_until.is_(None),
+                Car.image_claimed_until <= utc_now(),
+            ),
+        )
+        rows = session.exec(
+            update(Car)
+            .where(due)
+            .values(image_claimed_until=CarController._image_claim())
+            .returning(Car.id, Car.code, Car.image_source)
+        ).all()
+        session.commit()
+        for car_id, code, source in rows:
+            image_pipeline.submit(ImageJob(car_id=car_id, code=code, source=source))
+        return len(rows)
+
+    @staticmethod
+    def _set_image_claims(
+        session: Session, jobs: list[ImageJob], claimed_until: Optional[datetime]
+    ):
+        if jobs:
+            session.exec(
+                update(Car)
+                .where(
+                    Car.id.in_([job.car_id for job in jobs]),
+                    Car.image_status == ImageStatus.PENDING,
+                )
+                .values(image_claimed_until=claimed_until)
+            )
+            session.commit()
+
+    @staticmethod
+    def sweep_pending_images() -> int:
+        """
+        Renueva la reserva de las imágenes encoladas en este proceso (así no
+        vence mientras esperan su turno) y retoma las pendientes sin reserva.
+        """
+        with Session(db.engine) as session:
+            CarController._set_image_claims(
+                session, image_pipeline.jobs(), CarController._image_claim()
+            )
+            return CarController.resume_pending_images(session)
+
+    @staticmethod
+    def release_image_claims(jobs: list[ImageJob]):
+        """Libera la reserva de imágenes sin terminar (al apagar el proceso)"""
+        with Session(db.engine) as session:
+            CarController._set_image_claims(session, jobs, None)
 
     @staticmethod
     def _convert_image_to_url(car: Car) -> Car:
         """Convierte el nombre del archivo de imagen a URL completa"""
         if car.image:
+            if car.image_variants:
+                car.image_variants = CarController._build_srcset(
+                    car.image, car.image_variants
+                )
             car.image = f"{AppConfig.IMAGES_URL}/{car.image}"
+        elif car.image_status:
+            # Imagen pendiente o con error: se muestra el placeholder
+            car.image = AppConfig.IMAGE_PLACEHOLDER_URL
         return car
 
     @staticmethod
@@ -78,48 +496,481 @@ class CarController:
         return car
 
     @staticmethod
-    def get_cars(
-        session: Session,
-        code: Optional[str] = None,
-        search: Optional[str] = None,
-        brand: Optional[str] = None,
-        model: Optional[str] = None,
-        year: Optional[int] = None,
+    def _encode_cursor(car_id: int, rank: Optional[float] = None) -> str:
+        """Genera un cursor opaco a partir de la última fila de la página"""
+        payload = {"id": car_id}
+        if rank is not None:
+            payload["rank"] = rank
+        data = json.dumps(payload, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, ranked: bool = False) -> dict:
+        """Devuelve la posición (id y, si hay búsqueda, rank) donde continuar"""
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            position = {"id": int(payload["id"])}
+            if ranked:
+                position["rank"] = float(payload["rank"])
+            return position
+        except (ValueError, KeyError, TypeError) as e:
+            raise HTTPException(status_code=400, detail="Cursor inválido.") from e
+
+    @staticmethod
+    def _apply_filters(query, filters: CarFilters, match: Optional[str] = None):
+        """Aplica los filtros compartidos por la página y el conteo"""
+        if match:
+            query = search_index.apply(query, match)
+        if filters.code:
+            query = query.where(Car.code == filters.code)
+        # Comparaciones exactas (sin distinguir mayúsculas) para usar los índices
+        if filters.brand:
+            query = query.where(equals_ignore_case(Car.brand, filters.brand))
+        if filters.model:
+            query = query.where(equals_ignore_case(Car.model, filters.model))
+        if filters.year:
+            query = query.where(Car.year == filters.year)
+        if filters.year_min is not None:
+            query = query.where(Car.year >= filters.year_min)
+        if filters.year_max is not None:
+            query = query.where(Car.year <= filters.year_max)
+        if filters.price_min is not None:
+            query = query.where(Car.price >= filters.price_min)
+        if filters.price_max is not None:
+            query = query.where(Car.price <= filters.price_max)
+        if filters.km_min is not None:
+            query = query.where(Car.km >= filters.km_min)
+        if filters.km_max is not None:
+            query = query.where(Car.km <= filters.km_max)
+        for feature in FILTERABLE_FEATURES:
+            value = getattr(filters, feature)
+            if value is not None:
+                query = query.where(feature_equals(feature, value))
+        return query
+
+    @staticmethod
+    async def get_cars(
+        session: AsyncSession,
+        filters: CarFilters,
         offset: int = 0,
         limit: int = 100,
-    ) -> List[Car]:
-        query = select(Car)
-        if search:
-            search_term = f"%{search}%"
-            query = query.where(
-                (Car.brand.ilike(search_term)) | (Car.model.ilike(search_term))
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """
+        Página de vehículos con la forma de CarResponse, como dicts listos para
+        serializar. Se leen solo las columnas de CarRead como tuplas: sin
+        instancias del ORM ni validación de cada vehículo.
+        """
+        match = (
+            search_index.build_match_query(filters.search) if filters.search else None
+        )
+
+        # El total se calcula como subconsulta escalar para obtenerlo en el
+        # mismo viaje a la base de datos que la página.
+        total_query = CarController._apply_filters(
+            select(func.count()).select_from(Car), filters, match
+        ).scalar_subquery()
+
+        columns = [Car.__table__.c[name] for name in EXPORT_COLUMNS]
+        if match:
+            # Con búsqueda los resultados se ordenan por relevancia
+            rank = search_index.rank(match)
+            query = select(*columns, total_query, rank).order_by(rank, Car.id)
+        else:
+            query = select(*columns, total_query).order_by(Car.id)
+        query = CarController._apply_filters(query, filters, match)
+
+        if cursor:
+            # Paginación por keyset: el costo no crece con la profundidad
+            position = CarController._decode_cursor(cursor, ranked=bool(match))
+            if match:
+                query = query.where(
+                    (rank > position["rank"])
+                    | ((rank == position["rank"]) & (Car.id > position["id"]))
+                )
+            else:
+                query = query.where(Car.id > position["id"])
+        else:
+            query = query.offset(offset)
+        # Se pide una fila extra para saber si existe una página siguiente
+        rows = (await session.exec(query.limit(limit + 1))).all()
+
+        # El total y el rank vienen después de las columnas del vehículo
+        total_index = len(columns)
+        if rows:
+            total = rows[0][total_index]
+        else:
+            # Página vacía: el conteo no vino con las filas
+            count_query = CarController._apply_filters(
+                select(func.count()).select_from(Car), filters, match
             )
-        if code:
-            query = query.where(Car.code == code)
-        if brand:
-            query = query.where(Car.brand.contains(brand))
-        if model:
-            query = query.where(Car.model.contains(model))
-        if year:
-            query = query.where(Car.year == year)
-        cars = session.exec(query.offset(offset).limit(limit)).all()
-        # Convertir filename a URL y features a modelo en todos los coches
-        cars_serialized = []
-        for car in cars:
-            car = CarController._convert_image_to_url(car)
-            car = CarController._convert_features_to_model(car)
-            cars_serialized.append(car)
-        return cars_serialized
-
-    @staticmethod
-    def create_car(session: Session, car: CarCreate) -> Car:
-        existing_car = session.exec(select(Car).where(Car.code == car.code)).first()
-        if existing_car:
-            raise HTTPException(
-                status_code=409,
-                detail=f"El código del vehículo '{car.code}' ya existe.",
+            total = (await session.exec(count_query)).one()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = CarController._encode_cursor(
+                last[0], last[total_index + 1] if match else None
             )
 
+        return {
+            "total": total,
+            "offset": 0 if cursor else offset,
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "items": [CarController._export_record(row) for row in rows],
+        }
+
+    @staticmethod
+    def _similarity_record(car: Car) -> dict:
+        """Atributos del vehículo que usa el índice de similares"""
+        features = car.features
+        if hasattr(features, "model_dump"):
+            features = features.model_dump()
+        return {
+            "id": car.id,
+            "code": car.code,
+            "brand": car.brand,
+            "price": car.price,
+            "km": car.km,
+            "year": car.year,
+            "features": features,
+        }
+
+    @staticmethod
+    def rebuild_similarity_index(session: Session):
+        """Reconstruye el índice de similares con el inventario completo"""
+        revision = (session.get(Inventory, 1) or Inventory()).revision
+        query = select(*(Car.__table__.c[name] for name in SIMILARITY_COLUMNS))
+        rows = session.exec(query).all()
+        similarity_index.rebuild(
+            (dict(zip(SIMILARITY_COLUMNS, row)) for row in rows), revision
+        )
+
+    @staticmethod
+    def _refresh_similarity_index():
+        try:
+            with Session(db.read_engine) as session:
+                CarController.rebuild_similarity_index(session)
+        except Exception as e:
+            logger.error(f"Error al reconstruir el índice de similares: {e}")
+
+    @staticmethod
+    def start_similarity_index() -> asyncio.Future:
+        """
+        Arma el índice de similares en segundo plano (al iniciar la
+        aplicación), así no demora la primera respuesta. Las búsquedas de
+        similares que llegan antes esperan a que termine.
+        """
+        CarController._similarity_build = asyncio.get_running_loop().run_in_executor(
+            None, CarController._refresh_similarity_index
+        )
+        return CarController._similarity_build
+
+    @staticmethod
+    async def get_similar_cars(
+        session: AsyncSession, code: str, k: int, revision: int
+    ) -> dict:
+        """
+        Los `k` vehículos más parecidos al del código, del más cercano al más
+        lejano, con la forma de CarResponse. La búsqueda se resuelve en
+        memoria; la base solo se consulta para armar los vehículos elegidos.
+        """
+        build = CarController._similarity_build
+        if build is not None and not build.done():
+            await asyncio.shield(build)
+        if similarity_index.should_refresh(revision):
+            # Cambios hechos por otros procesos: el índice se reconstruye en
+            # segundo plano y mientras tanto se sigue usando el actual
+            asyncio.get_running_loop().run_in_executor(
+                None, CarController._refresh_similarity_index
+            )
+        neighbours = similarity_index.similar(code, k)
+        if neighbours is None:
+            # Vehículo creado en otro proceso y todavía no indexado
+            columns = [Car.__table__.c[name] for name in SIMILARITY_COLUMNS]
+            row = (await session.exec(select(*columns).where(Car.code == code))).first()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Car not found")
+            record = dict(zip(SIMILARITY_COLUMNS, row))
+            neighbours = similarity_index.similar_to(record, k, exclude=record["id"])
+
+        ids = [car_id for car_id, _ in neighbours]
+        columns = [Car.__table__.c[name] for name in EXPORT_COLUMNS]
+        rows = (await session.exec(select(*columns).where(Car.id.in_(ids)))).all()
+        records = {row[0]: CarController._export_record(row) for row in rows}
+        items = [records[car_id] for car_id in ids if car_id in records]
+        return {
+            "total": len(items),
+            "offset": 0,
+            "limit": k,
+            "next_cursor": None,
+            "items": items,
+        }
+
+    @staticmethod
+    async def get_similar_cars_json(code: str, k: int, revision: int = 0) -> bytes:
+        """Vehículos similares ya serializados, servidos desde la caché si es posible"""
+        key = f"similar:{code}:{k}:{revision}"
+        return await CarController._cached_json(
+            key,
+            lambda session: CarController.get_similar_cars(session, code, k, revision),
+        )
+
+    @staticmethod
+    async def get_facets(session: AsyncSession, filters: CarFilters) -> CarFacets:
+        """
+        Calcula los conteos por marca, año, combustible, transmisión y
+        carrocería, y los rangos de precio y km, en una sola consulta: los
+        vehículos filtrados se leen una vez (CTE) y cada faceta es un GROUP BY
+        sobre ese resultado unido con UNION ALL.
+        """
+        match = (
+            search_index.build_match_query(filters.search) if filters.search else None
+        )
+        filtered = CarController._apply_filters(
+            select(
+                Car.brand.label("brand"),
+                Car.year.label("year"),
+                Car.price.label("price"),
+                Car.km.label("km"),
+                *(feature_column(name).label(name) for name in FACET_FEATURES),
+            ),
+            filters,
+            match,
+        ).cte("filtered")
+
+        groups = [
+            select(
+                literal(name).label("facet"),
+                cast(filtered.c[name], String).label("value"),
+                func.count().label("count"),
+                # Tipados para que PostgreSQL acepte el UNION ALL
+                cast(null(), Float).label("min"),
+                cast(null(), Float).label("max"),
+            ).group_by(filtered.c[name])
+            for name in ("brand", "year", *FACET_FEATURES)
+        ]
+        ranges = [
+            select(
+                literal(name).label("facet"),
+                cast(null(), String).label("value"),
+                func.count().label("count"),
+                func.min(filtered.c[name]).label("min"),
+                func.max(filtered.c[name]).label("max"),
+            )
+            for name in ("price", "km")
+        ]
+        rows = (await session.exec(union_all(*groups, *ranges))).all()
+
+        counts = {name: [] for name in ("brand", "year", *FACET_FEATURES)}
+        limits = {}
+        total = 0
+        for facet, value, count, minimum, maximum in rows:
+            if facet in ("price", "km"):
+                limits[facet] = RangeFacet(min=minimum, max=maximum)
+                total = count
+            elif value is not None:
+                value = int(value) if facet == "year" else value
+                counts[facet].append(FacetCount(value=value, count=count))
+
+        # Años del más nuevo al más viejo; el resto por cantidad de vehículos
+        years = sorted(counts["year"], key=lambda item: item.value, reverse=True)
+        for name in ("brand", *FACET_FEATURES):
+            counts[name].sort(key=lambda item: (-item.count, item.value))
+        return CarFacets(
+            total=total,
+            brands=counts["brand"],
+            years=years,
+            fuel_types=counts["fuel_type"],
+            transmissions=counts["transmission"],
+            body_types=counts["body_type"],
+            price=limits["price"],
+            km=limits["km"],
+        )
+
+    @staticmethod
+    def _cache_key(kind: str, filters: CarFilters, **params) -> str:
+        """Clave de caché a partir del conjunto de filtros normalizado"""
+        normalized = filters.model_dump(exclude_none=True)
+        # Marca, modelo y búsqueda no distinguen mayúsculas
+        for name in ("search", "brand", "model"):
+            if name in normalized:
+                normalized[name] = " ".join(normalized[name].split()).casefold()
+        normalized.update(params)
+        return f"{kind}:{json.dumps(normalized, sort_keys=True)}"
+
+    @staticmethod
+    async def get_inventory_version(session: AsyncSession) -> Inventory:
+        """Revisión actual del inventario (una búsqueda por clave primaria)"""
+        return await session.get(Inventory, 1) or Inventory()
+
+    @staticmethod
+    def _revision_update():
+        """UPDATE que incrementa la revisión del inventario y la devuelve"""
+        return (
+            update(Inventory)
+            .where(Inventory.id == 1)
+            .values(revision=Inventory.revision + 1, updated_at=utc_now())
+            .returning(Inventory.revision)
+        )
+
+    @staticmethod
+    async def _bump_revision(session: AsyncSession) -> int:
+        """
+        Incrementa la revisión del inventario dentro de la transacción actual.
+        Devuelve la nueva revisión (la que queda al confirmar la transacción).
+        """
+        revision = (await session.exec(CarController._revision_update())).scalar()
+        if revision is None:
+            session.add(Inventory(revision=1))
+            return 1
+        return revision
+
+    @staticmethod
+    def _bump_revision_sync(session: Session) -> int:
+        """Como `_bump_revision`, para las sesiones síncronas (p. ej. las imágenes)"""
+        revision = session.exec(CarController._revision_update()).scalar()
+        if revision is None:
+            session.add(Inventory(revision=1))
+            return 1
+        return revision
+
+    @staticmethod
+    async def _cached_json(key: str, build: Callable[[AsyncSession], Awaitable]):
+        """
+        Respuesta ya serializada desde la caché. Si no está, las solicitudes
+        concurrentes con la misma clave comparten una sola consulta (en una
+        sesión propia, independiente de la solicitud que la inició) y una sola
+        serialización.
+        """
+        content = listing_cache.get(key)
+        if content is not None:
+            return content
+
+        async def load() -> bytes:
+            generation = listing_cache.generation
+            async with AsyncSession(db.async_read_engine) as session:
+                result = await build(session)
+            content = dumps(result)
+            listing_cache.set(key, content, generation)
+            return content
+
+        return await listing_flight.run(key, load)
+
+    @staticmethod
+    async def get_cars_json(
+        filters: CarFilters,
+        offset: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        revision: int = 0,
+    ) -> bytes:
+        """Página de vehículos ya serializada, servida desde la caché si es posible"""
+        # La revisión en la clave evita servir datos que otro proceso modificó
+        key = CarController._cache_key(
+            "cars",
+            filters,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            revision=revision,
+        )
+        return await CarController._cached_json(
+            key,
+            lambda session: CarController.get_cars(
+                session, filters, offset, limit, cursor
+            ),
+        )
+
+    @staticmethod
+    async def get_facets_json(filters: CarFilters, revision: int = 0) -> bytes:
+        """Facetas ya serializadas, servidas desde la caché si es posible"""
+        key = CarController._cache_key("facets", filters, revision=revision)
+        return await CarController._cached_json(
+            key, lambda session: CarController.get_facets(session, filters)
+        )
+
+    @staticmethod
+    def _export_record(row) -> dict:
+        """Arma el registro (mismos campos que CarRead) de una fila de EXPORT_COLUMNS"""
+        record = dict(zip(EXPORT_COLUMNS, row))
+        image, variants = record["image"], record["image_variants"]
+        record["image_variants"] = None
+        if image:
+            record["image"] = f"{AppConfig.IMAGES_URL}/{image}"
+            if variants:
+                record["image_variants"] = CarController._build_srcset(
+                    image, variants
+                ).model_dump()
+        elif record["image_status"]:
+            record["image"] = AppConfig.IMAGE_PLACEHOLDER_URL
+        # Todas las características, como las devuelve CarFeatures
+        features = record["features"]
+        if features is not None:
+            record["features"] = {
+                name: features.get(name) for name in CarFeatures.model_fields
+            }
+        return record
+
+    @staticmethod
+    async def export_cars(
+        filters: CarFilters, export_format: str = ExportFormat.NDJSON
+    ) -> AsyncIterator[str]:
+        """
+        Genera el inventario filtrado en NDJSON o CSV, un bloque por lote.
+        Las filas se leen con un cursor del lado del servidor (`yield_per`), así
+        la memoria usada no depende del tamaño del inventario. Abre su propia
+        sesión porque se consume mientras se envía la respuesta.
+        """
+        match = (
+            search_index.build_match_query(filters.search) if filters.search else None
+        )
+        query = select(*(Car.__table__.c[name] for name in EXPORT_COLUMNS))
+        if match:
+            query = query.order_by(search_index.rank(match), Car.id)
+        else:
+            query = query.order_by(Car.id)
+        query = CarController._apply_filters(query, filters, match)
+        query = query.execution_options(yield_per=AppConfig.EXPORT_BATCH_SIZE)
+
+        buffer = io.StringIO()
+        writer = None
+        if export_format == ExportFormat.CSV:
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_CSV_HEADER)
+
+        async with AsyncSession(db.async_read_engine) as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                for row in rows:
+                    record = CarController._export_record(row)
+                    if writer is None:
+                        buffer.write(json.dumps(record, ensure_ascii=False))
+                        buffer.write("\n")
+                        continue
+                    features = record.pop("features") or {}
+                    variants = record.pop("image_variants") or {}
+                    writer.writerow(
+                        [
+                            *record.values(),
+                            variants.get("webp"),
+                            variants.get("avif"),
+                            *(features.get(name) for name in CarFeatures.model_fields),
+                        ]
+                    )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    @staticmethod
+    def _build_car(car: CarCreate) -> Car:
+        """Arma la fila de la tabla a partir de los datos de creación"""
         # Primero obtener los datos del modelo
         car_data = car.model_dump()
 
@@ -127,46 +978,119 @@ class CarController:
         if car_data.get("features") and hasattr(car_data["features"], "model_dump"):
             car_data["features"] = car_data["features"].model_dump()
 
-        # Procesar la imagen: descargar y guardar en el sistema de archivos
-        if car.image:
-            response = requests.get(str(car.image))
-            if response.status_code == 200:
-                content_type = response.headers.get("Content-Type", "")
-                if content_type.startswith("image/"):
-                    # Guardar imagen en el sistema de archivos
-                    filename = CarController._save_image_to_file(
-                        response.content, car.code
-                    )
-                    car_data["image"] = filename
-                else:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="La URL proporcionada no contiene una imagen válida.",
+        # La imagen se descarga y convierte en segundo plano: el vehículo se
+        # crea de inmediato con la imagen pendiente.
+        image_source = car_data.pop("image", None)
+        if image_source:
+            car_data["image_source"] = str(image_source)
+            car_data["image_status"] = ImageStatus.PENDING
+            # Este proceso la encola: los demás no la retoman mientras tanto
+            car_data["image_claimed_until"] = CarController._image_claim()
+        return Car(**car_data)
+
+    @staticmethod
+    async def bulk_create_cars(
+        session: AsyncSession, items: List[tuple[int, CarCreate]]
+    ) -> List[BulkItemResult]:
+        """
+        Crea un lote de vehículos en una sola transacción. Los códigos ya
+        existentes se buscan con una única consulta (y de nuevo si otro proceso
+        crea alguno antes de confirmar) y las imágenes se encolan todas juntas
+        en el pipeline, que las descarga en paralelo.
+        """
+        codes = [car.code for _, car in items]
+        while True:
+            taken = set(
+                (await session.exec(select(Car.code).where(Car.code.in_(codes)))).all()
+            )
+
+            results = []
+            created = []
+            for index, car in items:
+                if car.code in taken:
+                    results.append(
+                        BulkItemResult(
+                            index=index,
+                            code=car.code,
+                            status=BulkItemStatus.CONFLICT,
+                            error=f"El código del vehículo '{car.code}' ya existe.",
+                        )
                     )
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"No se pudo descargar la imagen. Status code: {response.status_code}",
+                    continue
+                taken.add(car.code)
+                new_car = CarController._build_car(car)
+                session.add(new_car)
+                created.append((index, new_car))
+
+            if not created:
+                break
+            try:
+                # La actualización de la revisión ya inserta los vehículos
+                revision = await CarController._bump_revision(session)
+                await session.commit()
+            except IntegrityError:
+                # Otro proceso creó alguno de los códigos después de la
+                # consulta: se vuelve a consultar y se reintenta el lote, con
+                # esos vehículos informados como conflicto
+                await session.rollback()
+                new_codes = [new_car.code for _, new_car in created]
+                if not (
+                    await session.exec(select(Car.code).where(Car.code.in_(new_codes)))
+                ).first():
+                    raise
+                continue
+            listing_cache.invalidate()
+            similarity_index.upsert_many(
+                (CarController._similarity_record(new_car) for _, new_car in created),
+                revision,
+            )
+            break
+        for index, new_car in created:
+            results.append(
+                BulkItemResult(
+                    index=index,
+                    code=new_car.code,
+                    status=BulkItemStatus.CREATED,
+                    id=new_car.id,
                 )
+            )
+            if new_car.image_source:
+                CarController._enqueue_image(new_car)
+        return sorted(results, key=lambda result: result.index)
+
+    @staticmethod
+    async def create_car(session: AsyncSession, car: CarCreate) -> Car:
+        existing_car = (
+            await session.exec(select(Car).where(Car.code == car.code))
+        ).first()
+        if existing_car:
+            raise HTTPException(
+                status_code=409,
+                detail=f"El código del vehículo '{car.code}' ya existe.",
+            )
 
-        car = Car(**car_data)
+        car = CarController._build_car(car)
         session.add(car)
-        session.commit()
-        session.refresh(car)
+        revision = await CarController._bump_revision(session)
+        await session.commit()
+        listing_cache.invalidate()
+        await session.refresh(car)
+        similarity_index.upsert(CarController._similarity_record(car), revision)
+        if car.image_source:
+            CarController._enqueue_image(car)
         # Convertir filename a URL y features a modelo antes de devolver
         car = CarController._convert_image_to_url(car)
         car = CarController._convert_features_to_model(car)
         return car
 
     @staticmethod
-    def update_car(session: Session, car_id: int, car_data: CarCreate) -> Car:
-        car = session.get(Car, car_id)
+    async def update_car(
+        session: AsyncSession, car_id: int, car_data: CarCreate
+    ) -> Car:
+        car = await session.get(Car, car_id)
         if not car:
             raise HTTPException(status_code=404, detail="Car not found")
 
-        # Guardar el nombre de imagen anterior para eliminarlo si se actualiza
-        old_image = car.image
-
         # Obtener los datos del modelo
         update_data = car_data.model_dump(exclude_unset=True)
 
@@ -176,53 +1100,71 @@ class CarController:
         ):
             update_data["features"] = update_data["features"].model_dump()
 
-        # Procesar la imagen si se proporciona una nueva URL
-        if "image" in update_data and update_data["image"]:
-            response = requests.get(str(update_data["image"]))
-            if response.status_code == 200:
-                content_type = response.headers.get("Content-Type", "")
-                if content_type.startswith("image/"):
-                    # Guardar imagen en el sistema de archivos
-                    filename = CarController._save_image_to_file(
-                        response.content, car.code
-                    )
-                    update_data["image"] = filename
-                else:
-                    raise HTTPException(
-                        status_code=400,
-                        detail="La URL proporcionada no contiene una imagen válida.",
-                    )
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"No se pudo descargar la imagen. Status code: {response.status_code}",
-                )
+        # Una nueva URL de imagen se procesa en segundo plano; la imagen
+        # anterior se reemplaza recién cuando la nueva está lista.
+        enqueue_image = False
+        released_image = None
+        if "image" in update_data:
+            image_source = update_data.pop("image")
+            if not image_source:
+                # Se quitó la imagen del vehículo
+                released_image = car.image
+                car.image = None
+                car.image_source = None
+                car.image_status = None
+                car.image_variants = None
+                car.image_error = None
+            elif (
+                str(image_source) != car.image_source
+                or car.image_status != ImageStatus.READY
+            ):
+                # La misma URL ya procesada no se vuelve a descargar
+                car.image_source = str(image_source)
+                car.image_status = ImageStatus.PENDING
+                car.image_error = None
+                car.image_claimed_until = CarController._image_claim()
+                enqueue_image = True
 
         # Actualizar campos
         for key, value in update_data.items():
             setattr(car, key, value)
 
-        # Si se actualizó la imagen, eliminar la anterior
-        if old_image and car.image != old_image:
-            CarController._delete_image_file(old_image)
-
         session.add(car)
-        session.commit()
-        session.refresh(car)
+        revision = await CarController._bump_revision(session)
+        await session.commit()
+        listing_cache.invalidate()
+        await session.refresh(car)
+        similarity_index.upsert(CarController._similarity_record(car), revision)
+        if released_image:
+            # Borrar archivos y actualizar referencias no bloquea el event loop
+            await run_in_threadpool(CarController._release_image, released_image)
+        if enqueue_image:
+            CarController._enqueue_image(car)
         # Convertir filename a URL y features a modelo antes de devolver
         car = CarController._convert_image_to_url(car)
         car = CarController._convert_features_to_model(car)
         return car
 
     @staticmethod
-    def delete_car(session: Session, car_id: int) -> None:
-        car = session.get(Car, car_id)
+    async def delete_car(session: AsyncSession, car_id: int) -> None:
+        car = await session.get(Car, car_id)
         if not car:
             raise HTTPException(status_code=404, detail="Car not found")
 
-        # Eliminar la imagen del sistema de archivos
-        if car.image:
-            CarController._delete_image_file(car.image)
+        image = car.image
+        await session.delete(car)
+        revision = await CarController._bump_revision(session)
+        await session.commit()
+        listing_cache.invalidate()
+        similarity_index.remove(car_id, revision)
+        # Liberar la imagen (sus archivos se borran si nadie más la usa)
+        if image:
+            await run_in_threadpool(CarController._release_image, image)
 
-        session.delete(car)
-        session.commit()
+
+# Pipeline de imágenes en segundo plano (se inicia con la aplicación)
+image_pipeline = ImagePipeline(
+    process=CarController._process_image,
+    complete=CarController._attach_image,
+)
+image_sweeper = PendingImageSweeper(sweep=CarController.sweep_pending_images)
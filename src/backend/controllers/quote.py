@@ -0,0 +1,106 @@
+from fastapi import HTTPException
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from controllers.car import CarController
+from core import search as search_index
+from core.quotes import quote_matrix
+from models.car import Car, CarFilters
+from models.plan import FINANCING_PLANS, CarQuotes, Quote
+
+# Campos de cada cotización, en el orden de Quote
+QUOTE_FIELDS = tuple(field for field in Quote.model_fields if field != "plan")
+
+
+class QuoteController:
+    @staticmethod
+    def _quoted_price(price: float, promotion_price: Optional[float]) -> float:
+        """Se cotiza el precio promocional si el vehículo lo tiene"""
+        return promotion_price or price
+
+    @staticmethod
+    async def get_car_quotes(session: AsyncSession, code: str) -> CarQuotes:
+        """Cotizaciones de un vehículo con cada plan de financiación"""
+        row = (
+            await session.exec(
+                select(Car.price, Car.promotion_price).where(Car.code == code)
+            )
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Car not found")
+        price = QuoteController._quoted_price(*row)
+        matrix = {
+            name: values[0].tolist()
+            for name, values in quote_matrix([price], FINANCING_PLANS).items()
+        }
+        quotes = [
+            Quote(plan=plan.id, **{name: matrix[name][index] for name in QUOTE_FIELDS})
+            for index, plan in enumerate(FINANCING_PLANS)
+        ]
+        return CarQuotes(code=code, price=price, quotes=quotes)
+
+    @staticmethod
+    async def get_quote_matrix(
+        session: AsyncSession, filters: CarFilters, offset: int = 0, limit: int = 100
+    ) -> dict:
+        """
+        Cuota de cada vehículo filtrado con cada plan, con la forma de
+        QuoteMatrix. Los precios se leen como tuplas y se cotizan juntos.
+        """
+        match = (
+            search_index.build_match_query(filters.search) if filters.search else None
+        )
+        total_query = CarController._apply_filters(
+            select(func.count()).select_from(Car), filters, match
+        ).scalar_subquery()
+        query = select(Car.code, Car.price, Car.promotion_price, total_query)
+        if match:
+            query = query.order_by(search_index.rank(match), Car.id)
+        else:
+            query = query.order_by(Car.id)
+        query = CarController._apply_filters(query, filters, match)
+        rows = (await session.exec(query.offset(offset).limit(limit))).all()
+
+        if rows:
+            total = rows[0][3]
+        else:
+            count_query = CarController._apply_filters(
+                select(func.count()).select_from(Car), filters, match
+            )
+            total = (await session.exec(count_query)).one()
+
+        prices = [QuoteController._quoted_price(row[1], row[2]) for row in rows]
+        installments = quote_matrix(prices, FINANCING_PLANS)["installment"]
+        lowest = installments.min(axis=1)
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "plans": [plan.model_dump() for plan in FINANCING_PLANS],
+            "items": [
+                {
+                    "code": row[0],
+                    "price": price,
+                    "installments": values,
+                    "from_installment": minimum,
+                }
+                for row, price, values, minimum in zip(
+                    rows, prices, installments.tolist(), lowest.tolist()
+                )
+            ],
+        }
+
+    @staticmethod
+    async def get_quote_matrix_json(
+        filters: CarFilters, offset: int = 0, limit: int = 100, revision: int = 0
+    ) -> bytes:
+        """Matriz de cuotas ya serializada, servida desde la caché si es posible"""
+        key = CarController._cache_key(
+            "quotes", filters, offset=offset, limit=limit, revision=revision
+        )
+        return await CarController._cached_json(
+            key,
+            lambda session: QuoteController.get_quote_matrix(
+                session, filters, offset, limit
+            ),
+        )
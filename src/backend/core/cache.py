@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, TypeVar
+from core.config import CacheConfig
+
+
+class ResponseCache:
+    """
+    Caché LRU en memoria con TTL para respuestas ya serializadas (bytes JSON).
+    Las escrituras no borran entrada por entrada: incrementan un contador de
+    generación y toda entrada de una generación anterior cuenta como fallo.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[int, float, bytes]] = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, value = entry
+                if generation == self._generation and expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: bytes, generation: int):
+        """
+        Guarda una respuesta calculada con los datos de `generation`. Si hubo
+        una escritura mientras se calculaba, la respuesta ya es vieja y se
+        descarta.
+        """
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Invalida todas las entradas (se llama después de cada escritura)."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Agrupa las llamadas concurrentes con la misma clave: la primera ejecuta
+    la función y las demás esperan ese mismo resultado. La función corre en
+    una tarea propia, así que si el cliente que la inició se desconecta, los
+    demás igual reciben el resultado.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def run(self, key: str, function: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._done(key, done))
+            self.executions += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Evita el aviso de excepción no leída si todos se desconectaron
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._tasks),
+            "executions": self.executions,
+            "shared": self.shared,
+        }
+
+
+# Caché de los listados del catálogo (GET /cars y /cars/facets)
+listing_cache = ResponseCache(
+    max_entries=CacheConfig.MAX_ENTRIES,
+    ttl=CacheConfig.TTL,
+)
+
+# Consultas de listados en curso (comparten la ejecución y la serialización)
+listing_flight = SingleFlight()
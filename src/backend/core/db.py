@@ -1,34 +1,168 @@
 import os
 from core.logger import logger
-from sqlmodel import create_engine, SQLModel, Session, inspect
-from models.car import Car
+from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from models.inventory import Inventory
 from core.config import DatabaseConfig
+from core import metrics, migrations
 
-# Permite conexiones desde múltiples hilos (útil en aplicaciones web).
-connect_args = {"check_same_thread": False}
-engine = create_engine(DatabaseConfig.SQLITE_URL, connect_args=connect_args)
+
+def _apply_pragmas(dbapi_connection, read_only: bool):
+    """Aplica el perfil de DatabaseConfig a una conexión SQLite nueva."""
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        # El modo de journal queda guardado en el archivo; en una conexión de
+        # solo lectura no puede cambiarse.
+        cursor.execute(f"PRAGMA journal_mode = {DatabaseConfig.JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {DatabaseConfig.SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout = {DatabaseConfig.BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA mmap_size = {DatabaseConfig.MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = {DatabaseConfig.CACHE_SIZE}")
+    cursor.execute(f"PRAGMA temp_store = {DatabaseConfig.TEMP_STORE}")
+    cursor.close()
+
+
+def _async_url(url: str) -> str:
+    """URL equivalente con driver asíncrono (aiosqlite; psycopg ya lo es)"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url.removeprefix("sqlite:")
+    return url
+
+
+def _create_engine(url: str, read_only: bool = False, asynchronous: bool = False):
+    """
+    Crea el engine con el pool configurado (y los PRAGMAs en SQLite). Con
+    `asynchronous` devuelve un AsyncEngine para las rutas `async`.
+    """
+    factory = create_engine
+    if asynchronous:
+        factory = create_async_engine
+        url = _async_url(url)
+    pool_options = {
+        "pool_size": DatabaseConfig.POOL_SIZE,
+        "max_overflow": DatabaseConfig.MAX_OVERFLOW,
+        "pool_timeout": DatabaseConfig.POOL_TIMEOUT,
+    }
+    if not url.startswith("sqlite"):
+        # PostgreSQL (psycopg): se descartan conexiones cortadas por el
+        # servidor o por un proxy antes de entregarlas.
+        return factory(
+            url,
+            pool_pre_ping=True,
+            pool_recycle=DatabaseConfig.POOL_RECYCLE,
+            **pool_options,
+        )
+    # Permite conexiones desde múltiples hilos (útil en aplicaciones web).
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": DatabaseConfig.BUSY_TIMEOUT / 1000,
+    }
+    new_engine = factory(url, connect_args=connect_args, **pool_options)
+    event.listen(
+        new_engine.sync_engine if asynchronous else new_engine,
+        "connect",
+        lambda dbapi_connection, _: _apply_pragmas(dbapi_connection, read_only),
+    )
+    return new_engine
+
+
+def _create_engines(asynchronous: bool = False):
+    """
+    Engine principal y engine de lectura. Las rutas de solo lectura pueden
+    usar una réplica (en SQLite, p. ej. mantenida con Litestream o
+    `sqlite3 .backup`); si no hay réplica se usa la base principal.
+    """
+    primary = _create_engine(DatabaseConfig.URL, asynchronous=asynchronous)
+    if DatabaseConfig.READ_URL:
+        read_url = DatabaseConfig.READ_URL
+    elif DatabaseConfig.READ_REPLICA_PATH:
+        read_url = f"sqlite:///file:{DatabaseConfig.READ_REPLICA_PATH}?mode=ro&uri=true"
+    else:
+        return primary, primary
+    return primary, _create_engine(read_url, read_only=True, asynchronous=asynchronous)
+
+
+# Engines sincrónicos: migraciones y trabajos en segundo plano (imágenes)
+engine, read_engine = _create_engines()
+# Engines asíncronos: rutas de la API
+async_engine, async_read_engine = _create_engines(asynchronous=True)
+
+# Cantidad y duración de las consultas para /metrics
+for _main, _read in ((engine, read_engine), (async_engine, async_read_engine)):
+    metrics.instrument_engine(_main, "main")
+    # Sin réplica, el engine de lectura es el mismo que el principal
+    if _read is not _main:
+        metrics.instrument_engine(_read, "read")
 
 
 def get_session():
+    """
+    Sesión sincrónica para scripts y trabajos en segundo plano que corren en
+    hilos propios.
+    """
+    with Session(engine) as session:
+        yield session
+
+
+async def get_async_session():
     """
     Dependencia de FastAPI para obtener una sesión de base de datos.
     Esta función se usa cuando se necesita interactuar con la base de datos
     en las rutas de la API, principalmente en operaciones `CRUD` para asegurar
-    que cada solicitud tenga su propia sesión de base de datos.
+    que cada solicitud tenga su propia sesión de base de datos. Es asíncrona:
+    mientras espera a la base, el worker atiende otras solicitudes.
     """
-    with Session(engine) as session:
+    # Sin expirar al hacer commit: leer un atributo no debe disparar una
+    # consulta implícita (no permitida fuera de un `await`)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
 
 
+async def get_async_read_session():
+    """
+    Dependencia de FastAPI para las rutas que solo leen (GET). Usa la réplica
+    de solo lectura si está configurada.
+    """
+    async with AsyncSession(async_read_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def dispose_engines():
+    """
+    Cierra las conexiones de los pools (al apagar la aplicación). aiosqlite
+    usa un hilo por conexión que, abierto, impide que el proceso termine.
+    """
+    for current in {async_engine, async_read_engine}:
+        await current.dispose()
+    for current in {engine, read_engine}:
+        current.dispose()
+
+
+def reset_engines_after_fork():
+    """
+    Descarta en el proceso hijo (cada worker de gunicorn) las conexiones que
+    abrió el proceso principal antes del fork, sin cerrarlas: siguen siendo
+    del padre. Cada worker abre las suyas al recibir la primera solicitud.
+    """
+    for current in {engine, read_engine, async_engine, async_read_engine}:
+        getattr(current, "sync_engine", current).dispose(close=False)
+
+
 def create_db_and_tables(drop_existing: bool = False):
-    """Crear la base de datos y todas las tablas."""
-    os.makedirs(DatabaseConfig.DB_DIR, exist_ok=True)
+    """Crear la base de datos y aplicar las migraciones pendientes."""
+    if DatabaseConfig.DIALECT == "sqlite":
+        os.makedirs(DatabaseConfig.DB_DIR, exist_ok=True)
     if drop_existing:
-        SQLModel.metadata.drop_all(engine)
-    first_time = not inspect(engine).has_table(Car.__tablename__)
-    if first_time:
+        migrations.drop_all(engine)
+    if migrations.current_version(engine) == 0:
         logger.info("Creando todas las tablas en la base de datos.")
-        SQLModel.metadata.create_all(engine)
+    migrations.upgrade(engine)
+    with Session(engine) as session:
+        if not session.get(Inventory, 1):
+            session.add(Inventory())
+            session.commit()
 
 
 # Función para inicializar la base de datos con datos de ejemplo
@@ -1,14 +1,107 @@
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
 from core.config import EmailConfig
-import resend
-
-
-def send_email(to_email: str, subject: str, html_content: str):
-    resend.api_key = EmailConfig.RESEND_API_KEY
-    params: resend.Emails.SendParams = {
-        "to": to_email,
-        "from": EmailConfig.FROM_EMAIL,
-        "subject": subject,
-        "html": html_content,
-    }
-    email: resend.Email = resend.Emails.send(params)
-    return email
+from core.metrics import outbound
+
+if TYPE_CHECKING:
+    import resend
+
+
+@dataclass(frozen=True)
+class EmailMessage:
+    """Correo listo para enviar"""
+
+    to_email: str
+    subject: str
+    html: str
+    idempotency_key: Optional[str] = None
+
+    def to_params(self) -> "resend.Emails.SendParams":
+        return {
+            "to": self.to_email,
+            "from": EmailConfig.FROM_EMAIL,
+            "subject": self.subject,
+            "html": self.html,
+        }
+
+
+class ResendTransport:
+    """
+    Envía los correos con la API de Resend. El SDK (y `requests`, que usa por
+    debajo) se importa con el primer envío, no al iniciar la aplicación.
+    """
+
+    def __init__(self, api_key: Optional[str]):
+        self._api_key = api_key
+        self._resend = None
+
+    @property
+    def client(self):
+        if self._resend is None:
+            import resend
+
+            # La clave se configura una sola vez, no en cada envío
+            resend.api_key = self._api_key
+            self._resend = resend
+        return self._resend
+
+    def send(self, message: EmailMessage) -> str:
+        options = {}
+        if message.idempotency_key:
+            options["idempotency_key"] = message.idempotency_key
+        client = self.client
+        with outbound("resend"):
+            email: "resend.Email" = client.Emails.send(
+                message.to_params(), options or None
+            )
+        return email["id"]
+
+    def send_batch(
+        self, messages: list[EmailMessage], idempotency_key: Optional[str] = None
+    ) -> list[str]:
+        """Envía hasta 100 correos en una sola llamada; devuelve sus IDs en orden"""
+        options = {"idempotency_key": idempotency_key} if idempotency_key else None
+        client = self.client
+        with outbound("resend_batch"):
+            response = client.Batch.send(
+                [message.to_params() for message in messages], options
+            )
+        return [email["id"] for email in response["data"]]
+
+
+class FakeTransport:
+    """
+    Transporte local para desarrollo y pruebas: guarda los correos en memoria
+    en lugar de enviarlos. Respeta las claves de idempotencia como Resend.
+    """
+
+    def __init__(self):
+        self.sent: list[EmailMessage] = []
+        self._ids: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def send(self, message: EmailMessage) -> str:
+        with self._lock:
+            if message.idempotency_key in self._ids:
+                return self._ids[message.idempotency_key]
+            email_id = str(uuid.uuid4())
+            self.sent.append(message)
+            if message.idempotency_key:
+                self._ids[message.idempotency_key] = email_id
+            return email_id
+
+    def send_batch(
+        self, messages: list[EmailMessage], idempotency_key: Optional[str] = None
+    ) -> list[str]:
+        return [self.send(message) for message in messages]
+
+
+def create_transport():
+    if EmailConfig.TRANSPORT == "fake":
+        return FakeTransport()
+    return ResendTransport(EmailConfig.RESEND_API_KEY)
+
+
+transport = create_transport()
@@ -0,0 +1,220 @@
+import asyncio
+import contextlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+from core.config import ImageConfig
+from core.logger import logger
+from core.metrics import outbound
+
+
+class ImageDownloadError(Exception):
+    """La URL no pudo descargarse o no contiene una imagen válida."""
+
+
+class ImageProcessingError(Exception):
+    """La imagen descargada no pudo convertirse."""
+
+
+@dataclass(frozen=True)
+class ImageJob:
+    """Imagen a procesar para un vehículo"""
+
+    car_id: int
+    code: str
+    source: str
+
+
+class ImagePipeline:
+    """
+    Procesa imágenes en segundo plano, fuera del hilo de la solicitud.
+
+    Un event loop propio (en un hilo dedicado) descarga las imágenes con un
+    cliente `httpx` asíncrono con timeouts y conexiones reutilizadas; la
+    conversión con Pillow y la actualización de la base se ejecutan en un
+    pool acotado de hilos. `process` recibe el trabajo y los bytes descargados
+    y devuelve el resultado (p. ej. los archivos guardados); `complete` recibe
+    el trabajo, el resultado (o None) y el error (o None). El hilo y el pool
+    se crean con el primer trabajo.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[ImageJob, bytes], Any],
+        complete: Callable[[ImageJob, Any, Optional[str]], None],
+        workers: int = ImageConfig.WORKERS,
+        concurrency: int = ImageConfig.CONCURRENCY,
+        timeout: float = ImageConfig.DOWNLOAD_TIMEOUT,
+        max_bytes: int = ImageConfig.MAX_BYTES,
+    ):
+        self._process = process
+        self._complete = complete
+        self._workers = workers
+        self._concurrency = concurrency
+        self._timeout = timeout
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pending: dict[Future, ImageJob] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        """Cantidad de trabajos encolados o en proceso"""
+        return len(self._pending)
+
+    def jobs(self) -> list[ImageJob]:
+        """Trabajos encolados o en proceso"""
+        with self._lock:
+            return list(self._pending.values())
+
+    def start(self):
+        """Inicia el event loop y el pool de hilos (si no estaban iniciados)."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix="image-worker"
+            )
+            self._thread = threading.Thread(
+                target=self._run, args=(loop, ready), name="image-pipeline", daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    def _run(self, loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        # httpx se importa con el primer trabajo, no al iniciar la aplicación
+        import httpx
+
+        asyncio.set_event_loop(loop)
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self._timeout),
+            limits=httpx.Limits(max_connections=self._concurrency),
+            follow_redirects=True,
+        )
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+        loop.run_until_complete(self._client.aclose())
+        loop.close()
+
+    def submit(self, job: ImageJob) -> Future:
+        """Encola un trabajo. Puede llamarse desde cualquier hilo."""
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._handle(job), self._loop)
+        with self._lock:
+            self._pending[future] = job
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._pending.pop(future, None)
+
+    def stop(self, timeout: Optional[float] = None) -> list[ImageJob]:
+        """
+        Espera los trabajos pendientes (hasta `timeout`) y detiene el
+        pipeline. Devuelve los trabajos que quedaron sin terminar.
+        """
+        with self._lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            pending = list(self._pending)
+            self._loop = None
+        if loop is None:
+            return []
+        if pending:
+            logger.info(f"Esperando {len(pending)} imágenes en proceso.")
+            wait(pending, timeout=timeout)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        executor.shutdown(wait=True)
+        with self._lock:
+            # Los que el event loop no llegó a terminar
+            unfinished = list(self._pending.values())
+            self._pending.clear()
+        return unfinished
+
+    async def _handle(self, job: ImageJob):
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            result, error = None, None
+            try:
+                content = await self._download(job.source)
+                result = await loop.run_in_executor(
+                    self._executor, self._process, job, content
+                )
+            except Exception as e:
+                logger.error(f"Error al procesar la imagen de '{job.code}': {e}")
+                error = str(e)
+            try:
+                await loop.run_in_executor(
+                    self._executor, self._complete, job, result, error
+                )
+            except Exception as e:
+                logger.error(f"Error al asociar la imagen de '{job.code}': {e}")
+
+    async def _download(self, url: str) -> bytes:
+        with outbound("image_download"):
+            async with self._client.stream("GET", url) as response:
+                if response.status_code != 200:
+                    raise ImageDownloadError(
+                        f"No se pudo descargar la imagen. Status code: {response.status_code}"
+                    )
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith("image/"):
+                    raise ImageDownloadError(
+                        "La URL proporcionada no contiene una imagen válida."
+                    )
+                content = bytearray()
+                async for chunk in response.aiter_bytes():
+                    content.extend(chunk)
+                    if len(content) > self._max_bytes:
+                        raise ImageDownloadError("La imagen supera el tamaño máximo.")
+                return bytes(content)
+
+
+class PendingImageSweeper:
+    """
+    Tarea periódica del event loop de la aplicación que mantiene las
+    imágenes pendientes repartidas entre los procesos. Cada `interval`
+    segundos ejecuta `sweep` en un hilo: renueva la reserva de las imágenes
+    encoladas en este proceso y toma las pendientes cuya reserva venció (las
+    de una ejecución anterior o de un proceso que terminó sin procesarlas).
+    """
+
+    def __init__(
+        self,
+        sweep: Callable[[], int],
+        interval: float = ImageConfig.RESUME_INTERVAL,
+    ):
+        self._sweep = sweep
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Inicia la tarea en el event loop actual (desde el lifespan)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="image-sweeper")
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                resumed = await loop.run_in_executor(None, self._sweep)
+                if resumed:
+                    logger.info(f"Se retomaron {resumed} imágenes pendientes.")
+            except Exception as e:
+                logger.error(f"Error al retomar las imágenes pendientes: {e}")
+            await asyncio.sleep(self._interval)
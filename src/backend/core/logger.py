@@ -19,17 +19,29 @@ stream_handler.setLevel(LoggerConfig.LOG_LEVEL)
 stream_handler.setFormatter(stream_formatter)
 logger.addHandler(stream_handler)
 
-library_loggers = (
-    name
-    for name in logging.root.manager.loggerDict.keys()
-    if isinstance(name, str)
-    and any(prefix in name for prefix in LoggerConfig.LIBRARY_LOGS_PREFIXES)
-)
 
-# Reemplazar loggers de uvicorn y fastapi por el custom
-for name in library_loggers:
-    # reemplazar handlers y nivel
-    lib_logger = logging.getLogger(name)
-    lib_logger.handlers = logger.handlers
-    lib_logger.setLevel(logger.level)
-    lib_logger.propagate = False  # Evitar mensajes duplicados
+def configure_library_loggers():
+    """
+    Hace que los logs de uvicorn, fastapi, sqlalchemy y sqlmodel salgan con el
+    formato de la aplicación. Se llama al iniciar la aplicación (no al importar
+    este módulo), cuando el servidor ya configuró sus loggers: así el resultado
+    no depende del orden de los imports.
+
+    Alcanza con el logger raíz de cada librería (los demás le propagan sus
+    mensajes) y los que no propagan, como `uvicorn.access`. Solo se les asigna
+    el nivel de la aplicación a los que no tienen uno propio: sqlalchemy fija
+    WARNING, y en INFO registraría cada consulta.
+    """
+    for name in LoggerConfig.LIBRARY_LOGS_PREFIXES:
+        lib_logger = logging.getLogger(name)
+        if lib_logger.level == logging.NOTSET:
+            lib_logger.setLevel(logger.level)
+        lib_logger.handlers = logger.handlers
+        lib_logger.propagate = False  # Evitar mensajes duplicados
+    for name, lib_logger in list(logging.root.manager.loggerDict.items()):
+        if (
+            isinstance(lib_logger, logging.Logger)
+            and not lib_logger.propagate
+            and name.split(".", 1)[0] in LoggerConfig.LIBRARY_LOGS_PREFIXES
+        ):
+            lib_logger.handlers = logger.handlers
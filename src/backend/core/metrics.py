@@ -0,0 +1,369 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional
+from sqlalchemy import event
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Buckets en segundos para las latencias (HTTP, SQL, imágenes, servicios externos)
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Buckets para la cantidad de consultas SQL por solicitud
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base de las métricas: valores por combinación de etiquetas"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        labels = _format_labels(self.label_names, key)
+        return [f"{self.name}{labels} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Mide la duración del bloque `with` y la registra"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key: tuple, value) -> list[str]:
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            labels = _format_labels(
+                self.label_names, key, f'le="{_format_value(bound)}"'
+            )
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Registro de métricas en memoria, expuesto en el formato de texto de
+    Prometheus. Los valores que ya se cuentan en otro lado (p. ej. las
+    estadísticas de las cachés) se copian a las métricas en cada lectura con
+    las funciones registradas en `on_collect`.
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def on_collect(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.counter(
+    "http_requests_total",
+    "Solicitudes HTTP atendidas",
+    ("method", "route", "status"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Duración de las solicitudes HTTP",
+    ("method", "route"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "Solicitudes HTTP en curso"
+)
+
+# Base de datos
+db_queries = registry.counter(
+    "db_queries_total", "Consultas SQL ejecutadas", ("engine",)
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Duración de cada consulta SQL", ("engine",)
+)
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request",
+    "Consultas SQL por solicitud HTTP",
+    ("route",),
+    buckets=COUNT_BUCKETS,
+)
+db_time_per_request = registry.histogram(
+    "db_time_per_request_seconds",
+    "Tiempo total en consultas SQL por solicitud HTTP",
+    ("route",),
+)
+
+# Imágenes y servicios externos
+image_stage_duration = registry.histogram(
+    "image_processing_seconds",
+    "Tiempo de cada etapa de la conversión de imágenes",
+    ("stage",),
+)
+outbound_request_duration = registry.histogram(
+    "outbound_request_duration_seconds",
+    "Duración de las llamadas a servicios externos",
+    ("service", "outcome"),
+)
+
+# Cachés y trabajos en segundo plano (se copian al leer /metrics)
+cache_hits = registry.gauge("cache_hits", "Aciertos de la caché", ("cache",))
+cache_misses = registry.gauge("cache_misses", "Fallos de la caché", ("cache",))
+cache_hit_ratio = registry.gauge(
+    "cache_hit_ratio", "Proporción de aciertos de la caché", ("cache",)
+)
+background_jobs_pending = registry.gauge(
+    "background_jobs_pending", "Trabajos en cola o en proceso", ("queue",)
+)
+
+
+def record_cache(cache: str, hits: int, misses: int):
+    """Copia los contadores de una caché a las métricas"""
+    lookups = hits + misses
+    cache_hits.set(hits, cache=cache)
+    cache_misses.set(misses, cache=cache)
+    cache_hit_ratio.set(hits / lookups if lookups else 0.0, cache=cache)
+
+
+@contextmanager
+def outbound(service: str):
+    """Mide una llamada a un servicio externo (con su resultado: ok o error)"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        outbound_request_duration.observe(
+            time.perf_counter() - started, service=service, outcome=outcome
+        )
+
+
+class _RequestStats:
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+# Consultas de la solicitud en curso (None fuera de una solicitud)
+_request_stats: ContextVar[Optional[_RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def instrument_engine(engine, name: str):
+    """Registra cantidad y duración de las consultas de un engine (sync o async)"""
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(target, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_queries.inc(engine=name)
+        db_query_duration.observe(elapsed, engine=name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.duration += elapsed
+
+    @event.listens_for(target, "handle_error")
+    def handle_error(context):
+        started = (
+            context.connection.info.get("query_started") if context.connection else None
+        )
+        if started:
+            started.pop()
+
+
+def _route_label(scope: Scope, root_path: str) -> str:
+    """
+    Plantilla de la ruta (`/cars/{code}`), no la URL: así la cantidad de
+    series no crece con cada código o parámetro distinto.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Aplicaciones montadas (archivos estáticos): el prefijo del montaje
+    if scope.get("root_path", "") != root_path:
+        return scope["root_path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia y las solicitudes en curso por ruta,
+    y la cantidad y el tiempo de las consultas SQL de cada solicitud.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        root_path = scope.get("root_path", "")
+        status = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_stats.reset(token)
+            route = _route_label(scope, root_path)
+            method = scope["method"]
+            http_requests.inc(method=method, route=route, status=status)
+            http_request_duration.observe(elapsed, method=method, route=route)
+            db_queries_per_request.observe(stats.queries, route=route)
+            db_time_per_request.observe(stats.duration, route=route)
@@ -0,0 +1,154 @@
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+from sqlmodel import SQLModel
+from core import search
+from core.logger import logger
+from models.car import TEXT_FEATURES, Car
+from models.email import EmailOutbox
+from models.image import ImageBlob  # noqa: F401 (registra la tabla)
+from models.inventory import Inventory  # noqa: F401 (registra la tabla)
+from models.migration import SchemaVersion
+
+# Clave del bloqueo de PostgreSQL que serializa las migraciones entre procesos
+_ADVISORY_LOCK_KEY = 7_461_001
+
+
+@dataclass(frozen=True)
+class Migration:
+    """Cambio del esquema identificado por un número de versión creciente"""
+
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _create_tables(connection: Connection):
+    # Crea solo las tablas (e índices) que falten
+    SQLModel.metadata.create_all(connection)
+
+
+def _add_column(connection: Connection, table_name: str, column_name: str):
+    """Agrega una columna del modelo si la tabla todavía no la tiene."""
+    existing = {
+        column["name"] for column in inspect(connection).get_columns(table_name)
+    }
+    if column_name in existing:
+        return
+    column = SQLModel.metadata.tables[table_name].c[column_name]
+    logger.info(f"Agregando la columna {table_name}.{column_name}.")
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.execute(
+        text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+    )
+
+
+def _add_image_columns(connection: Connection):
+    for name in ("image_status", "image_source", "image_error", "image_variants"):
+        _add_column(connection, Car.__tablename__, name)
+
+
+def _create_car_indexes(connection: Connection):
+    existing = {
+        column["name"] for column in inspect(connection).get_columns(Car.__tablename__)
+    }
+    for index in Car.__table__.indexes:
+        if any(column.name not in existing for column in index.columns):
+            # Índice de una columna que agrega una migración posterior: se
+            # crea en ella
+            continue
+        # Se invoca como listener de DDL para respetar `ddl_if` (índices
+        # que solo existen en un motor)
+        CreateIndex(index, if_not_exists=True)(Car.__table__, connection)
+
+
+def _create_email_outbox(connection: Connection):
+    EmailOutbox.__table__.create(connection, checkfirst=True)
+
+
+def _add_image_claim(connection: Connection):
+    _add_column(connection, Car.__tablename__, "image_claimed_until")
+    _create_car_indexes(connection)
+
+
+def _recreate_feature_indexes(connection: Connection):
+    # Los filtros de texto de `features` pasan a no distinguir mayúsculas: en
+    # SQLite cambia la expresión de sus índices y PostgreSQL suma los de lower()
+    if connection.dialect.name == "sqlite":
+        for name in TEXT_FEATURES:
+            connection.execute(text(f"DROP INDEX IF EXISTS ix_car_{name}"))
+    _create_car_indexes(connection)
+
+
+# Historial de migraciones. Las bases creadas antes de existir este registro
+# las aplican todas: cada paso comprueba lo que ya existe. Los cambios nuevos
+# se agregan al final con la versión siguiente; nunca se modifican los ya
+# publicados.
+MIGRATIONS = (
+    Migration(1, "Esquema inicial", _create_tables),
+    Migration(2, "Estado y variantes de las imágenes", _add_image_columns),
+    Migration(3, "Índices del catálogo", _create_car_indexes),
+    Migration(4, "Índice de búsqueda de texto completo", search.create_search_index),
+    Migration(5, "Outbox de correos", _create_email_outbox),
+    Migration(
+        6,
+        "Filtros de características sin distinguir mayúsculas",
+        _recreate_feature_indexes,
+    ),
+    Migration(
+        7,
+        "Búsqueda sin acentos y con pesos en PostgreSQL",
+        search.rebuild_postgres_search_index,
+    ),
+    Migration(8, "Reserva de las imágenes pendientes", _add_image_claim),
+)
+
+
+def _lock(connection: Connection):
+    """Evita que dos procesos migren a la vez (varios contenedores al iniciar)."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY}
+        )
+
+
+def _applied_versions(connection: Connection) -> set[int]:
+    return set(connection.execute(select(SchemaVersion.version)).scalars())
+
+
+def current_version(engine: Engine) -> int:
+    """Última versión aplicada (0 si la base no tiene migraciones)."""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(SchemaVersion.__tablename__):
+            return 0
+        return max(_applied_versions(connection), default=0)
+
+
+def upgrade(engine: Engine):
+    """Aplica, en orden y cada una en su transacción, las migraciones pendientes."""
+    with engine.begin() as connection:
+        _lock(connection)
+        SchemaVersion.__table__.create(connection, checkfirst=True)
+    for migration in MIGRATIONS:
+        with engine.begin() as connection:
+            _lock(connection)
+            if migration.version in _applied_versions(connection):
+                continue
+            logger.info(
+                f"Aplicando la migración {migration.version}: {migration.description}."
+            )
+            migration.apply(connection)
+            connection.execute(
+                SchemaVersion.__table__.insert().values(
+                    version=migration.version, description=migration.description
+                )
+            )
+
+
+def drop_all(engine: Engine):
+    """Elimina todas las tablas, incluido el registro de migraciones."""
+    with engine.begin() as connection:
+        search.drop_search_index(connection)
+    SQLModel.metadata.drop_all(engine)
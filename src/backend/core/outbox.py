@@ -0,0 +1,298 @@
+import asyncio
+import hashlib
+import random
+from datetime import timedelta, timezone
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from core import db
+from core.config import EmailConfig
+from core.email import EmailMessage, transport as default_transport
+from core.logger import logger
+from models.email import EmailOutbox, EmailStatus
+from models.inventory import utc_now
+
+
+async def enqueue_emails(session: AsyncSession, messages: list[EmailMessage]) -> int:
+    """
+    Guarda los correos en el outbox y avisa al despachador. Los que ya
+    existen (misma clave de idempotencia) no se duplican. Devuelve la cantidad
+    de correos nuevos.
+    """
+    keys = [message.idempotency_key for message in messages]
+    existing = set(
+        (
+            await session.exec(
+                select(EmailOutbox.idempotency_key).where(
+                    EmailOutbox.idempotency_key.in_(keys)
+                )
+            )
+        ).all()
+    )
+    new_messages = [m for m in messages if m.idempotency_key not in existing]
+    for message in new_messages:
+        session.add(
+            EmailOutbox(
+                idempotency_key=message.idempotency_key,
+                to_email=message.to_email,
+                subject=message.subject,
+                html=message.html,
+            )
+        )
+    await session.commit()
+    if new_messages:
+        email_dispatcher.notify()
+    return len(new_messages)
+
+
+class EmailDispatcher:
+    """
+    Envía en segundo plano los correos del outbox.
+
+    Corre como una tarea del event loop de la aplicación: toma los correos
+    vencidos (marcándolos como "sending" por `send_timeout` segundos, así otro
+    proceso no los toma a la vez), los envía con a lo sumo `concurrency`
+    llamadas simultáneas y registra el resultado. El primer intento agrupa los
+    correos en lotes (API batch de Resend); los reintentos se envían de a uno
+    con su propia clave de idempotencia y espera exponencial. Los correos que
+    quedaron en "sending" sin confirmar también se envían de a uno: la clave
+    de un lote depende de cómo se agruparon y al reagruparlos podrían salir
+    dos veces.
+    """
+
+    def __init__(
+        self,
+        transport=default_transport,
+        concurrency: int = EmailConfig.CONCURRENCY,
+        batch_size: int = EmailConfig.BATCH_SIZE,
+        poll_interval: float = EmailConfig.POLL_INTERVAL,
+        max_attempts: int = EmailConfig.MAX_ATTEMPTS,
+        backoff_base: float = EmailConfig.BACKOFF_BASE,
+        backoff_max: float = EmailConfig.BACKOFF_MAX,
+        send_timeout: float = EmailConfig.SEND_TIMEOUT,
+    ):
+        self.transport = transport
+        self._concurrency = concurrency
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._send_timeout = send_timeout
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def start(self):
+        """Inicia la tarea en el event loop actual (desde el lifespan)."""
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="email-dispatcher")
+
+    def notify(self):
+        """Avisa que hay correos nuevos (evita esperar al próximo sondeo)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, timeout: Optional[float] = None):
+        """Envía los correos ya vencidos (hasta `timeout`) y detiene la tarea."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        self._stopping = True
+        self.notify()
+        try:
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Quedaron correos sin enviar; se enviarán al reiniciar.")
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Error al despachar los correos: {e}")
+                claimed = 0
+            if self._stopping and not claimed:
+                return
+            if claimed:
+                # Puede haber más correos vencidos: seguir sin esperar
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), await self._idle_time())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _idle_time(self) -> float:
+        """Segundos hasta el próximo reintento (como mucho, `poll_interval`)"""
+        async with AsyncSession(db.async_engine) as session:
+            next_attempt_at = (
+                await session.exec(
+                    select(func.min(EmailOutbox.next_attempt_at)).where(
+                        EmailOutbox.status.in_(
+                            (EmailStatus.PENDING, EmailStatus.SENDING)
+                        )
+                    )
+                )
+            ).one()
+        if next_attempt_at is None:
+            return self._poll_interval
+        if next_attempt_at.tzinfo is None:
+            # SQLite no guarda la zona horaria (siempre es UTC)
+            next_attempt_at = next_attempt_at.replace(tzinfo=timezone.utc)
+        delay = (next_attempt_at - utc_now()).total_seconds()
+        return min(max(delay, 0), self._poll_interval)
+
+    async def dispatch_once(self) -> int:
+        """Envía una tanda de correos vencidos. Devuelve cuántos se tomaron."""
+        emails, recovered = await self._claim(self._batch_size * self._concurrency)
+        if not emails:
+            return 0
+        # Primer intento: en lotes. Reintentos y recuperados: de a uno.
+        fresh, single = [], []
+        for email in emails:
+            if email.attempts == 0 and email.id not in recovered:
+                fresh.append(email)
+            else:
+                single.append(email)
+        groups = [
+            fresh[start : start + self._batch_size]
+            for start in range(0, len(fresh), self._batch_size)
+        ]
+        groups += [[email] for email in single]
+        semaphore = asyncio.Semaphore(self._concurrency)
+
+        async def send(group: list[EmailOutbox]):
+            async with semaphore:
+                await self._send_group(group)
+
+        await asyncio.gather(*(send(group) for group in groups))
+        return len(emails)
+
+    async def _claim(self, limit: int) -> tuple[list[EmailOutbox], set[int]]:
+        """
+        Toma hasta `limit` correos vencidos. Devuelve los correos y los IDs de
+        los que ya estaban en "sending" (un envío anterior sin confirmar).
+        """
+        now = utc_now()
+        due = and_(
+            or_(
+                EmailOutbox.status == EmailStatus.PENDING,
+                # Envíos que quedaron sin confirmar (p. ej. por un reinicio)
+                EmailOutbox.status == EmailStatus.SENDING,
+            ),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        async with AsyncSession(db.async_engine, expire_on_commit=False) as session:
+            rows = (
+                await session.exec(
+                    select(EmailOutbox.id, EmailOutbox.status)
+                    .where(due)
+                    .order_by(EmailOutbox.next_attempt_at)
+                    .limit(limit)
+                )
+            ).all()
+            if not rows:
+                return [], set()
+            ids = [email_id for email_id, _ in rows]
+            recovered = {
+                email_id for email_id, status in rows if status == EmailStatus.SENDING
+            }
+            # La condición se repite en el UPDATE: si otro proceso tomó la
+            # fila primero, ya no cumple `due` y no se devuelve.
+            result = await session.exec(
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(ids), due)
+                .values(
+                    status=EmailStatus.SENDING,
+                    next_attempt_at=now + timedelta(seconds=self._send_timeout),
+                )
+                .returning(EmailOutbox)
+            )
+            emails = list(result.scalars())
+            await session.commit()
+        return sorted(emails, key=lambda email: email.id), recovered
+
+    async def _send_group(self, emails: list[EmailOutbox]):
+        messages = [
+            EmailMessage(
+                to_email=email.to_email,
+                subject=email.subject,
+                html=email.html,
+                idempotency_key=email.idempotency_key,
+            )
+            for email in emails
+        ]
+        try:
+            # El SDK de Resend es bloqueante: se ejecuta fuera del event loop
+            if len(messages) == 1:
+                provider_ids = [
+                    await run_in_threadpool(self.transport.send, messages[0])
+                ]
+            else:
+                batch_key = hashlib.sha256(
+                    "\n".join(message.idempotency_key for message in messages).encode()
+                ).hexdigest()
+                provider_ids = await run_in_threadpool(
+                    self.transport.send_batch, messages, f"batch-{batch_key}"
+                )
+        except Exception as e:
+            logger.error(f"Error al enviar {len(emails)} correo(s): {e}")
+            await self._record_failure(emails, str(e))
+            return
+        await self._record_success(emails, provider_ids)
+
+    async def _record_success(self, emails: list[EmailOutbox], provider_ids: list[str]):
+        now = utc_now()
+        async with AsyncSession(db.async_engine) as session:
+            for email, provider_id in zip(emails, provider_ids):
+                await session.exec(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == email.id)
+                    .values(
+                        status=EmailStatus.SENT,
+                        attempts=email.attempts + 1,
+                        provider_id=provider_id,
+                        last_error=None,
+                        sent_at=now,
+                    )
+                )
+            await session.commit()
+
+    def _backoff(self, attempts: int) -> float:
+        """Espera antes del próximo intento (exponencial, con tope y jitter)"""
+        delay = min(self._backoff_base * 2 ** (attempts - 1), self._backoff_max)
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _record_failure(self, emails: list[EmailOutbox], error: str):
+        now = utc_now()
+        async with AsyncSession(db.async_engine) as session:
+            for email in emails:
+                attempts = email.attempts + 1
+                if attempts >= self._max_attempts:
+                    logger.error(
+                        f"Se descartó el correo {email.id} a {email.to_email} "
+                        f"tras {attempts} intentos."
+                    )
+                    values = {"status": EmailStatus.FAILED}
+                else:
+                    values = {
+                        "status": EmailStatus.PENDING,
+                        "next_attempt_at": now
+                        + timedelta(seconds=self._backoff(attempts)),
+                    }
+                await session.exec(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == email.id)
+                    .values(attempts=attempts, last_error=error[:1000], **values)
+                )
+            await session.commit()
+
+
+# Despachador del outbox (se inicia con la aplicación)
+email_dispatcher = EmailDispatcher()
@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Sequence
+import numpy as np
+from core.config import FinancingConfig
+from models.plan import PlanTerms
+
+# Precisión y máximo de iteraciones al despejar la tasa del CFT
+IRR_TOLERANCE = 1e-12
+IRR_MAX_ITERATIONS = 100
+
+
+@dataclass(frozen=True)
+class AmortizationSchedule:
+    """
+    Cronograma del sistema francés para un capital de 1: como todos los montos
+    son proporcionales al capital, el de cada vehículo se obtiene escalándolo.
+    Los arreglos son de solo lectura porque el cronograma se comparte (caché).
+    """
+
+    rate: float
+    months: int
+    installment: float
+    principal: np.ndarray
+    interest: np.ndarray
+    balance: np.ndarray
+
+    @property
+    def total_interest(self) -> float:
+        return float(self.interest.sum())
+
+
+@lru_cache(maxsize=FinancingConfig.SCHEDULE_CACHE_SIZE)
+def amortization_schedule(rate: float, months: int) -> AmortizationSchedule:
+    """Cronograma de cuotas fijas para una tasa nominal anual (%) y un plazo"""
+    monthly = rate / 100 / 12
+    periods = np.arange(1, months + 1)
+    if monthly == 0:
+        installment = 1 / months
+        balance = 1 - installment * periods
+    else:
+        growth = (1 + monthly) ** periods
+        installment = monthly / (1 - (1 + monthly) ** -months)
+        balance = growth - installment * (growth - 1) / monthly
+    # El último saldo es cero salvo por el error de redondeo
+    balance[-1] = 0.0
+    interest = np.concatenate(([1.0], balance[:-1])) * monthly
+    principal = installment - interest
+    for values in (principal, interest, balance):
+        values.flags.writeable = False
+    return AmortizationSchedule(
+        rate=rate,
+        months=months,
+        installment=float(installment),
+        principal=principal,
+        interest=interest,
+        balance=balance,
+    )
+
+
+def _monthly_irr(amount: float, payments: np.ndarray, guess: float) -> float:
+    """Tasa mensual que iguala el monto recibido con los pagos (Newton)"""
+    if payments.sum() <= amount:
+        return 0.0
+    periods = np.arange(1, len(payments) + 1)
+    rate = max(guess, 1e-6)
+    for _ in range(IRR_MAX_ITERATIONS):
+        discount = (1 + rate) ** -periods
+        value = (payments * discount).sum() - amount
+        slope = -(periods * payments * discount / (1 + rate)).sum()
+        step = value / slope
+        rate -= step
+        if abs(step) < IRR_TOLERANCE:
+            break
+    return rate
+
+
+@lru_cache(maxsize=FinancingConfig.SCHEDULE_CACHE_SIZE)
+def plan_factors(
+    rate: float, months: int, vat: float, fee: float
+) -> tuple[float, float, float]:
+    """
+    Cuota, intereses totales (por unidad de capital) y CFT efectivo anual (%)
+    de un plan. El CFT suma el IVA sobre los intereses de cada cuota y los
+    gastos de otorgamiento, que se descuentan del monto recibido.
+    """
+    schedule = amortization_schedule(rate, months)
+    payments = schedule.installment + schedule.interest * vat / 100
+    monthly = _monthly_irr(1 - fee / 100, payments, rate / 100 / 12)
+    cft = ((1 + monthly) ** 12 - 1) * 100
+    return schedule.installment, schedule.total_interest, float(cft)
+
+
+def quote_matrix(
+    prices: Sequence[float],
+    plans: Sequence[PlanTerms],
+    vat: float = FinancingConfig.VAT_ON_INTEREST,
+    fee: float = FinancingConfig.ORIGINATION_FEE,
+) -> dict[str, np.ndarray]:
+    """
+    Cotiza todos los precios con todos los planes en una sola pasada. Cada
+    arreglo tiene una fila por precio y una columna por plan; los montos se
+    redondean a centavos.
+    """
+    prices = np.asarray(prices, dtype=np.float64).reshape(-1, 1)
+    down_rate = np.array([plan.down_payment for plan in plans]) / 100
+    installment, interest, cft = np.array(
+        [plan_factors(plan.rate, plan.months, vat, fee) for plan in plans]
+    ).T.reshape(3, 1, -1)
+
+    down_payment = prices * down_rate
+    financed = prices - down_payment
+    total_interest = financed * interest
+    # Las cuotas devuelven el capital más los intereses
+    total_cost = (
+        down_payment
+        + financed
+        + total_interest * (1 + vat / 100)
+        + financed * fee / 100
+    )
+    return {
+        "down_payment": np.round(down_payment, 2),
+        "financed": np.round(financed, 2),
+        "installment": np.round(financed * installment, 2),
+        "total_interest": np.round(total_interest, 2),
+        "total_cost": np.round(total_cost, 2),
+        "cft": np.round(np.broadcast_to(cft, financed.shape), 2),
+    }
@@ -0,0 +1,120 @@
+import importlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fastapi import HTTPException, Request
+from core.config import AppConfig
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_LIMIT_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """
+    Límite de un token bucket: se admiten ráfagas de hasta `burst`
+    solicitudes y el balde se recarga a `rate` solicitudes por segundo.
+    """
+
+    rate: float
+    burst: int
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """Interpreta límites como "5/minute" (5 por minuto, ráfagas de 5)"""
+        match = _LIMIT_PATTERN.match(value)
+        if not match:
+            raise ValueError(
+                f"Límite inválido: '{value}'. Formato esperado: N/second|minute|hour|day"
+            )
+        amount = int(match.group(1))
+        return cls(rate=amount / _PERIODS[match.group(2)], burst=amount)
+
+
+class MemoryBackend:
+    """
+    Token buckets en memoria del proceso. Cada proceso (worker) lleva su
+    propia cuenta; para compartir los límites entre procesos se configura
+    otro backend con la misma interfaz (`take`) sobre un almacenamiento
+    compartido.
+    """
+
+    def __init__(self, max_keys: int = AppConfig.RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        # clave -> (tokens disponibles, momento de la última recarga)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """
+        Consume un token del balde `key`. Devuelve 0 si la solicitud se admite
+        o los segundos que faltan para que haya un token disponible.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                retry_after = 0.0
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Los baldes más viejos ya están llenos (o casi): se descartan
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+def create_backend():
+    """
+    Backend de los límites según `AppConfig.RATE_LIMIT_BACKEND`: "memory" o
+    la ruta de una clase propia ("paquete.modulo:Clase").
+    """
+    if AppConfig.RATE_LIMIT_BACKEND == "memory":
+        return MemoryBackend()
+    module, _, name = AppConfig.RATE_LIMIT_BACKEND.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+def client_ip(request: Request) -> str:
+    """IP del cliente; detrás de nginx es la que viene en X-Real-IP"""
+    if AppConfig.RATE_LIMIT_TRUST_X_REAL_IP:
+        real_ip = request.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """Aplica los límites y responde 429 (con Retry-After) al excederlos."""
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+
+    async def check(self, scope: str, key: str, limit: RateLimit):
+        if not self.enabled:
+            return
+        retry_after = await self.backend.take(f"{scope}:{key}", limit)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiadas solicitudes. Intenta nuevamente más tarde.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    def by_ip(self, scope: str, limit: RateLimit):
+        """Dependencia de FastAPI que limita las solicitudes por IP del cliente"""
+
+        async def dependency(request: Request):
+            await self.check(scope, client_ip(request), limit)
+
+        return dependency
+
+
+rate_limiter = RateLimiter(create_backend(), enabled=AppConfig.RATE_LIMIT_ENABLED)
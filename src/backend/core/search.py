@@ -0,0 +1,165 @@
+import re
+from typing import Optional
+from sqlalchemy import Float, cast, column, func, literal, literal_column, table, text
+from sqlalchemy.engine import Connection
+from core.config import DatabaseConfig
+from core.logger import logger
+from models.car import Car
+
+FTS_TABLE = "car_fts"
+IS_POSTGRES = DatabaseConfig.DIALECT == "postgresql"
+
+# Tabla virtual FTS5 para usar en las consultas (rowid == car.id)
+car_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+# Índice externo ("external content") sobre la tabla car: no duplica los
+# textos, solo guarda el índice invertido. `remove_diacritics 2` hace que
+# "diésel" y "diesel" sean el mismo término y `prefix` acelera las búsquedas
+# por prefijo mientras el usuario escribe.
+_CREATE_INDEX = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    brand, model, description,
+    content='car', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+"""
+
+# Marca y modelo pesan más que la descripción en el ranking (bm25)
+_CONFIGURE_RANK = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) "
+    "VALUES('rank', 'bm25(10.0, 10.0, 1.0)')"
+)
+
+_REBUILD_INDEX = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"
+
+# Triggers que mantienen el índice sincronizado con create/update/delete
+_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS car_fts_ai AFTER INSERT ON car BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, brand, model, description)
+        VALUES (new.id, new.brand, new.model, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS car_fts_ad AFTER DELETE ON car BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, brand, model, description)
+        VALUES ('delete', old.id, old.brand, old.model, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS car_fts_au
+    AFTER UPDATE OF brand, model, description ON car BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, brand, model, description)
+        VALUES ('delete', old.id, old.brand, old.model, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, brand, model, description)
+        VALUES (new.id, new.brand, new.model, new.description);
+    END
+    """,
+)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# PostgreSQL no tiene FTS5: se usa un tsvector sobre los mismos campos con un
+# índice GIN por expresión. La configuración 'simple' no aplica stemming.
+# Como en FTS5, los acentos se quitan del documento y de la consulta con
+# `unaccent` y marca y modelo pesan más que la descripción (peso A contra D
+# en ts_rank: 1.0 y 0.1). unaccent no es IMMUTABLE (depende del search_path),
+# así que se usa con un envoltorio que fija el diccionario y puede indexarse.
+PG_SEARCH_INDEX = "ix_car_search"
+PG_UNACCENT = "car_search_unaccent"
+_PG_CREATE_UNACCENT = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    f"""
+    CREATE OR REPLACE FUNCTION {PG_UNACCENT}(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, value) $$
+    """,
+)
+_PG_DOCUMENT = (
+    f"setweight(to_tsvector('simple', {PG_UNACCENT}("
+    "coalesce(brand, '') || ' ' || coalesce(model, ''))), 'A') || "
+    f"setweight(to_tsvector('simple', {PG_UNACCENT}("
+    "coalesce(description, ''))), 'D')"
+)
+_pg_document = literal_column(_PG_DOCUMENT)
+
+
+def _pg_query(match_query: str):
+    return func.to_tsquery("simple", getattr(func, PG_UNACCENT)(literal(match_query)))
+
+
+def create_search_index(connection: Connection):
+    """Crea el índice de búsqueda (FTS5 o GIN en PostgreSQL) si no existe."""
+    if connection.dialect.name == "postgresql":
+        for statement in _PG_CREATE_UNACCENT:
+            connection.execute(text(statement))
+        connection.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS {PG_SEARCH_INDEX} "
+                f"ON car USING gin (({_PG_DOCUMENT}))"
+            )
+        )
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    if not exists:
+        logger.info("Creando el índice de búsqueda de texto completo.")
+        connection.execute(text(_CREATE_INDEX))
+        connection.execute(text(_CONFIGURE_RANK))
+        # Indexar los vehículos que ya existían antes del índice
+        connection.execute(text(_REBUILD_INDEX))
+    for trigger in _TRIGGERS:
+        connection.execute(text(trigger))
+
+
+def rebuild_postgres_search_index(connection: Connection):
+    """Vuelve a crear el índice de PostgreSQL (sin acentos). En SQLite no cambia."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f"DROP INDEX IF EXISTS {PG_SEARCH_INDEX}"))
+        create_search_index(connection)
+
+
+def drop_search_index(connection: Connection):
+    """Elimina el índice de búsqueda (en SQLite los triggers se van con la tabla car)."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(f"DROP INDEX IF EXISTS {PG_SEARCH_INDEX}"))
+        return
+    connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Convierte el texto ingresado por el usuario en una consulta de texto
+    completo (FTS5 o tsquery). Cada palabra se busca por prefijo y todas deben
+    aparecer, así "toy cor" encuentra "Toyota Corolla". Devuelve None si no
+    hay palabras para buscar.
+    """
+    tokens = _TOKEN_PATTERN.findall(search)
+    if not tokens:
+        return None
+    if IS_POSTGRES:
+        return " & ".join(f"{token.lower()}:*" for token in tokens)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def apply(query, match_query: str):
+    """Filtra `query` por los vehículos que coinciden con la búsqueda."""
+    if IS_POSTGRES:
+        return query.where(_pg_document.op("@@")(_pg_query(match_query)))
+    # La búsqueda se resuelve en el índice FTS5 y se une por rowid
+    return query.join(car_fts, car_fts.c.rowid == Car.id).where(
+        literal_column(FTS_TABLE).op("MATCH")(match_query)
+    )
+
+
+def rank(match_query: str):
+    """Relevancia de cada resultado: menor es más relevante (como bm25 de FTS5)."""
+    if IS_POSTGRES:
+        # ts_rank devuelve `real`: en doble precisión el valor del cursor
+        # vuelve exacto y la comparación por keyset no pierde filas
+        score = func.ts_rank(_pg_document, _pg_query(match_query))
+        return -cast(score, Float)
+    return car_fts.c.rank
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+import orjson
+
+
+def _default(value):
+    """Tipos que orjson no conoce: los modelos de Pydantic se vuelcan a dict"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    JSON en bytes. Los listados se arman como dicts y listas, sin modelos
+    intermedios, así que se serializan directamente sin volver a validarse.
+    """
+    return orjson.dumps(content, default=_default)
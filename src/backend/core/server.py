@@ -0,0 +1,18 @@
+from uvicorn_worker import UvicornWorker as BaseUvicornWorker
+from core.config import AppConfig
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Worker de gunicorn que ejecuta la aplicación con uvicorn sobre uvloop y
+    httptools. Al apagarse deja de aceptar conexiones, espera las solicitudes
+    en curso (hasta `AppConfig.DRAIN_TIMEOUT`) y después corre el cierre del
+    lifespan, que envía los correos y termina las imágenes pendientes.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": AppConfig.DRAIN_TIMEOUT,
+    }
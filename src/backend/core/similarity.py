@@ -0,0 +1,361 @@
+import math
+import threading
+import time
+from typing import Iterable, Optional
+import numpy as np
+from core.config import SimilarityConfig
+
+# Atributos numéricos (se estandarizan) y su peso en la distancia. Precio y
+# kilómetros en escala logarítmica: importa la diferencia relativa. El
+# primero es la clave por la que se ordena el índice.
+NUMERIC_WEIGHTS = {
+    "price": 3.0,
+    "year": 2.0,
+    "km": 1.5,
+    "passengers": 0.5,
+    "doors": 0.5,
+    "airbags": 0.3,
+}
+LOG_SCALED = ("price", "km")
+# Atributos numéricos que descartan candidatos antes de calcular la distancia
+PREFILTERED = (1, 2)
+# Atributos categóricos: suman su peso (al cuadrado) a la distancia si difieren
+CATEGORY_WEIGHTS = {
+    "brand": 1.5,
+    "body_type": 1.5,
+    "fuel_type": 1.0,
+    "transmission": 1.0,
+    "air_conditioning": 0.3,
+    "abs": 0.3,
+}
+# Vehículos de precio cercano con los que empieza cada búsqueda
+CANDIDATES = 512
+
+
+class SimilarityIndex:
+    """
+    Índice en memoria para buscar los vehículos más parecidos a uno dado.
+
+    Cada vehículo es una fila de una matriz NumPy con sus atributos numéricos
+    estandarizados (y multiplicados por su peso) y otra con el código de cada
+    atributo categórico. Las filas están ordenadas por precio. Como ningún
+    vehículo está más cerca que su diferencia en un solo atributo, una
+    búsqueda mide primero los vehículos de precio cercano y después solo los
+    que están dentro de la `k`-ésima distancia en precio, año y kilómetros.
+    El resultado es el mismo que comparando contra todo el inventario.
+
+    Las altas, modificaciones y bajas actualizan solo la fila del vehículo,
+    con la media y el desvío de la última reconstrucción completa, y avanzan
+    `revision` mientras no falten revisiones intermedias. Los cambios hechos
+    por otros procesos (las revisiones que faltan) se incorporan al
+    reconstruirlo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Media y escala de cada atributo numérico (de la última reconstrucción)
+        self._mean = np.zeros(len(NUMERIC_WEIGHTS))
+        self._scale = np.array(list(NUMERIC_WEIGHTS.values()))
+        self._vocabulary: dict[tuple[str, object], int] = {}
+        self._category_weights = np.square(list(CATEGORY_WEIGHTS.values()))
+        self._load(
+            np.zeros((0, len(NUMERIC_WEIGHTS)), dtype=np.float32),
+            np.zeros((0, len(CATEGORY_WEIGHTS)), dtype=np.int32),
+            np.zeros(0, dtype=np.int64),
+            [],
+        )
+        # Cambios recibidos durante una reconstrucción (se aplican al terminar)
+        self._journal: Optional[list[tuple]] = None
+        self.revision: Optional[int] = None
+        # Revisiones aplicadas localmente después de una que falta
+        self._applied: set[int] = set()
+        self.built_at = 0.0
+        self.queries = 0
+
+    def _load(self, numeric, categories, ids, codes: list[str]):
+        """Reemplaza el contenido con filas ya ordenadas por precio"""
+        self._numeric = numeric
+        self._categories = categories
+        self._ids = ids
+        self._keys = np.ascontiguousarray(numeric[:, 0])
+        # Código y precio de cada vehículo, para ubicar su fila
+        self._codes = {code: int(car_id) for code, car_id in zip(codes, ids)}
+        self._car_codes = {car_id: code for code, car_id in self._codes.items()}
+        self._car_keys = dict(zip(self._codes.values(), self._keys.tolist()))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def _raw_numeric(record: dict) -> list[float]:
+        features = record.get("features") or {}
+        values = []
+        for name in NUMERIC_WEIGHTS:
+            value = record[name] if name in record else features.get(name)
+            if value is None:
+                values.append(math.nan)
+            elif name in LOG_SCALED:
+                values.append(math.log1p(max(value, 0)))
+            else:
+                values.append(float(value))
+        return values
+
+    def _category_codes(self, record: dict) -> list[int]:
+        features = record.get("features") or {}
+        codes = []
+        for name in CATEGORY_WEIGHTS:
+            value = record[name] if name in record else features.get(name)
+            if isinstance(value, str):
+                value = value.casefold()
+            key = (name, value)
+            code = self._vocabulary.get(key)
+            if code is None:
+                code = self._vocabulary[key] = len(self._vocabulary)
+            codes.append(code)
+        return codes
+
+    def _vector(self, record: dict) -> tuple[np.ndarray, np.ndarray]:
+        """Fila normalizada de un vehículo (los faltantes quedan en la media)"""
+        raw = np.array(self._raw_numeric(record))
+        numeric = np.where(np.isnan(raw), 0.0, (raw - self._mean) * self._scale)
+        categories = np.array(self._category_codes(record), dtype=np.int32)
+        return numeric.astype(np.float32), categories
+
+    def rebuild(self, records: Iterable[dict], revision: Optional[int] = None):
+        """
+        Reconstruye el índice completo (estadísticas incluidas). `records`
+        son dicts con `id`, `code`, los atributos y `features`.
+        """
+        with self._lock:
+            self._journal = []
+        try:
+            records = list(records)
+            raw = np.array(
+                [self._raw_numeric(record) for record in records], dtype=np.float64
+            ).reshape(len(records), len(NUMERIC_WEIGHTS))
+            # Columnas sin ningún valor: media 0 y desvío 1
+            missing = np.isnan(raw)
+            counts = np.maximum((~missing).sum(axis=0), 1)
+            mean = np.where(missing, 0.0, raw).sum(axis=0) / counts
+            variance = np.where(missing, 0.0, (raw - mean) ** 2).sum(axis=0)
+            std = np.sqrt(variance / counts)
+            std[std == 0] = 1.0
+            scale = np.array(list(NUMERIC_WEIGHTS.values())) / std
+            numeric = np.where(missing, 0.0, (raw - mean) * scale).astype(np.float32)
+            order = np.argsort(numeric[:, 0], kind="stable")
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            self._mean, self._scale = mean, scale
+            self._vocabulary = {}
+            categories = np.array(
+                [self._category_codes(record) for record in records], dtype=np.int32
+            ).reshape(len(records), len(CATEGORY_WEIGHTS))
+            ids = np.array([record["id"] for record in records], dtype=np.int64)
+            self._load(
+                numeric[order],
+                categories[order],
+                ids[order],
+                [records[index]["code"] for index in order],
+            )
+            journal, self._journal = self._journal, None
+            self.revision = revision
+            if revision is not None:
+                self._applied = {
+                    applied for applied in self._applied if applied > revision
+                }
+            for action, value, change_revision in journal:
+                self._apply(action, value)
+                self._advance(change_revision)
+            self._advance(None)
+            self.built_at = time.monotonic()
+
+    def upsert(self, record: dict, revision: Optional[int] = None):
+        """Agrega o actualiza un vehículo (`revision`: la del cambio ya guardado)"""
+        self._change("upsert", [record], revision)
+
+    def upsert_many(self, records: Iterable[dict], revision: Optional[int] = None):
+        """Agrega o actualiza varios vehículos (p. ej. una importación)"""
+        self._change("upsert", list(records), revision)
+
+    def remove(self, car_id: int, revision: Optional[int] = None):
+        """Quita un vehículo (si estaba en el índice)"""
+        self._change("remove", car_id, revision)
+
+    def advance(self, revision: int):
+        """Registra una revisión que no cambia el índice (p. ej. una imagen)"""
+        with self._lock:
+            self._advance(revision)
+
+    def _change(self, action: str, value, revision: Optional[int]):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((action, value, revision))
+            self._apply(action, value)
+            self._advance(revision)
+
+    def _advance(self, revision: Optional[int]):
+        """
+        Suma `revision` a las aplicadas y avanza `self.revision` mientras la
+        siguiente ya esté aplicada. Si falta una (la hizo otro proceso), el
+        índice queda en la anterior hasta la próxima reconstrucción.
+        """
+        if revision is not None and (self.revision is None or revision > self.revision):
+            self._applied.add(revision)
+        if self.revision is None:
+            return
+        while self.revision + 1 in self._applied:
+            self.revision += 1
+            self._applied.remove(self.revision)
+
+    def _apply(self, action: str, value):
+        if action == "remove":
+            self._delete([value])
+            return
+        if not value:
+            return
+        self._delete([record["id"] for record in value])
+        if len(value) == 1:
+            self._insert(value[0])
+            return
+        # Muchas filas: se agregan al final y se vuelve a ordenar una sola vez
+        vectors = [self._vector(record) for record in value]
+        numeric = np.concatenate([self._numeric, [vector[0] for vector in vectors]])
+        categories = np.concatenate(
+            [self._categories, [vector[1] for vector in vectors]]
+        )
+        ids = np.concatenate([self._ids, [record["id"] for record in value]])
+        codes = [self._car_codes[int(car_id)] for car_id in self._ids]
+        codes += [record["code"] for record in value]
+        order = np.argsort(numeric[:, 0], kind="stable")
+        self._load(
+            numeric[order], categories[order], ids[order], [codes[i] for i in order]
+        )
+
+    def _delete(self, car_ids: list[int]):
+        for car_id in car_ids:
+            if car_id not in self._car_keys:
+                continue
+            row = self._row(car_id)
+            self._numeric = np.delete(self._numeric, row, axis=0)
+            self._categories = np.delete(self._categories, row, axis=0)
+            self._ids = np.delete(self._ids, row)
+            self._keys = np.delete(self._keys, row)
+            del self._codes[self._car_codes.pop(car_id)]
+            del self._car_keys[car_id]
+
+    def _insert(self, record: dict):
+        numeric, categories = self._vector(record)
+        row = int(np.searchsorted(self._keys, numeric[0]))
+        self._numeric = np.insert(self._numeric, row, numeric, axis=0)
+        self._categories = np.insert(self._categories, row, categories, axis=0)
+        self._ids = np.insert(self._ids, row, record["id"])
+        self._keys = np.insert(self._keys, row, numeric[0])
+        self._codes[record["code"]] = record["id"]
+        self._car_codes[record["id"]] = record["code"]
+        self._car_keys[record["id"]] = float(numeric[0])
+
+    def _row(self, car_id: int) -> int:
+        """Fila actual de un vehículo (se busca por su precio)"""
+        key = self._car_keys[car_id]
+        start = int(np.searchsorted(self._keys, key, "left"))
+        end = int(np.searchsorted(self._keys, key, "right"))
+        return start + int(np.flatnonzero(self._ids[start:end] == car_id)[0])
+
+    def similar(self, code: str, k: int) -> Optional[list[tuple[int, float]]]:
+        """
+        Los `k` vehículos más parecidos al del código (id y distancia, del más
+        cercano al más lejano), o None si el código no está en el índice.
+        """
+        with self._lock:
+            car_id = self._codes.get(code)
+            if car_id is None:
+                return None
+            row = self._row(car_id)
+            return self._nearest(
+                self._numeric[row].copy(), self._categories[row].copy(), k, car_id
+            )
+
+    def similar_to(
+        self, record: dict, k: int, exclude: Optional[int] = None
+    ) -> list[tuple[int, float]]:
+        """Los `k` vehículos más parecidos a uno que no está en el índice"""
+        with self._lock:
+            numeric, categories = self._vector(record)
+            return self._nearest(numeric, categories, k, exclude)
+
+    def _distances(
+        self, rows, numeric: np.ndarray, categories: np.ndarray, skip: Optional[int]
+    ) -> np.ndarray:
+        difference = self._numeric[rows] - numeric
+        distances = np.einsum("ij,ij->i", difference, difference)
+        distances += (self._categories[rows] != categories) @ self._category_weights
+        if skip is not None:
+            distances[self._ids[rows] == skip] = np.inf
+        return distances
+
+    def _nearest(
+        self,
+        numeric: np.ndarray,
+        categories: np.ndarray,
+        k: int,
+        skip: Optional[int],
+    ) -> list[tuple[int, float]]:
+        self.queries += 1
+        size = len(self._ids)
+        k = min(k, size - (skip in self._car_keys))
+        if k <= 0:
+            return []
+        key = numeric[0]
+        center = int(np.searchsorted(self._keys, key))
+        start, end = max(center - CANDIDATES, 0), min(center + CANDIDATES, size)
+        rows = np.arange(start, end)
+        distances = self._distances(rows, numeric, categories, skip)
+        # Un vehículo más lejano que la k-ésima distancia en algún atributo no
+        # puede estar entre los k más cercanos
+        radius = np.sqrt(np.partition(distances, k - 1)[k - 1]) * (1 + 1e-6)
+        lower = int(np.searchsorted(self._keys, key - radius, "left"))
+        upper = int(np.searchsorted(self._keys, key + radius, "right"))
+        if lower < start or upper > end:
+            lower, upper = min(lower, start), max(upper, end)
+            window = self._numeric[lower:upper]
+            inside = np.ones(upper - lower, dtype=bool)
+            for column in PREFILTERED:
+                inside &= np.abs(window[:, column] - numeric[column]) <= radius
+            rows = lower + np.flatnonzero(inside)
+            distances = self._distances(rows, numeric, categories, skip)
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return [
+            (int(self._ids[rows[index]]), float(np.sqrt(distances[index])))
+            for index in nearest
+        ]
+
+    def should_refresh(self, revision: int) -> bool:
+        """
+        Si hay que reconstruir el índice: no refleja `revision` (ni por una
+        reconstrucción ni por sus propios cambios) y ya pasó el intervalo
+        mínimo desde la última reconstrucción. Devuelve True una sola vez por
+        intervalo, así no se lanzan reconstrucciones simultáneas.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self.revision is not None and revision <= self.revision
+            ) or now - self.built_at < SimilarityConfig.REFRESH_INTERVAL:
+                return False
+            self.built_at = now
+            return True
+
+    def stats(self) -> dict:
+        return {
+            "cars": len(self._ids),
+            "revision": self.revision,
+            "queries": self.queries,
+        }
+
+
+similarity_index = SimilarityIndex()
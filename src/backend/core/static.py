@@ -0,0 +1,50 @@
+import os
+import re
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import FileResponse, Response
+from starlette.types import Scope
+from core.config import AppConfig
+
+# Imágenes direccionadas por contenido (hash + variante): nunca cambian
+HASHED_IMAGE_PATTERN = re.compile(r"^[0-9a-f]{32}(-\d+w)?\.(webp|avif)$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImageFiles(StaticFiles):
+    """
+    Archivos de imágenes de los vehículos. Agrega encabezados de caché de
+    larga duración (inmutables para las imágenes con hash) a lo que ya
+    resuelve StaticFiles: ETag, Last-Modified, 304 y Range.
+
+    Con `AppConfig.IMAGES_ACCEL_REDIRECT` configurado no se envían los bytes:
+    se responde con `X-Accel-Redirect` y nginx sirve el archivo directamente
+    desde el volumen compartido.
+    """
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        filename = os.path.basename(full_path)
+        if HASHED_IMAGE_PATTERN.match(filename):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = (
+                f"public, max-age={AppConfig.IMAGES_CACHE_MAX_AGE}"
+            )
+
+        if AppConfig.IMAGES_ACCEL_REDIRECT and isinstance(response, FileResponse):
+            prefix = AppConfig.IMAGES_ACCEL_REDIRECT.rstrip("/")
+            headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name in ("cache-control", "content-type", "etag", "last-modified")
+            }
+            headers["X-Accel-Redirect"] = f"{prefix}/{filename}"
+            return Response(status_code=status_code, headers=headers)
+        return response
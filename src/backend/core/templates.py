@@ -0,0 +1,198 @@
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional
+from markupsafe import Markup
+from core.config import BASE_DIR, TemplateConfig
+from core.logger import logger
+
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
+
+TEMPLATES_DIR = Path(BASE_DIR) / "templates"
+
+
+class TemplateRenderer:
+    """
+    Renderiza los templates de los correos.
+
+    Los templates se compilan una sola vez (`warm`) y se guardan en memoria:
+    sin `auto_reload` no se vuelve a consultar el disco en cada correo. Con un
+    directorio de bytecode, los procesos nuevos cargan los templates ya
+    compilados. Los fragmentos del vehículo y del plan se guardan ya
+    renderizados por clave (código del vehículo o nombre del plan), junto con
+    los datos con que se renderizaron: si los datos cambian, se renderizan de
+    nuevo. Cada render acumula su tiempo en `stats`. El entorno de Jinja (y
+    el import de jinja2) se crea con el primer template que se compila.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        auto_reload: bool,
+        bytecode_cache_dir: str = "",
+        fragment_cache_size: int = 1024,
+    ):
+        self.directory = directory
+        self.bytecode_cache_dir = bytecode_cache_dir
+        self.auto_reload = auto_reload
+        self.fragment_cache_size = fragment_cache_size
+        self._env: Optional["Environment"] = None
+        self._templates: dict[str, "Template"] = {}
+        self._fragments: OrderedDict[tuple[str, str], tuple[dict, Markup]] = (
+            OrderedDict()
+        )
+        self._timings: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+
+    @property
+    def env(self) -> "Environment":
+        if self._env is None:
+            with self._lock:
+                if self._env is None:
+                    self._env = self._create_environment()
+        return self._env
+
+    def _create_environment(self) -> "Environment":
+        from jinja2 import (
+            Environment,
+            FileSystemBytecodeCache,
+            FileSystemLoader,
+            select_autoescape,
+        )
+
+        bytecode_cache = None
+        if self.bytecode_cache_dir:
+            Path(self.bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(self.bytecode_cache_dir)
+        return Environment(
+            loader=FileSystemLoader(self.directory),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=self.auto_reload,
+            bytecode_cache=bytecode_cache,
+        )
+
+    def warm(self):
+        """
+        Compila todos los templates. Se llama en segundo plano al iniciar la
+        aplicación: si llega un correo antes, compila solo los que usa.
+        """
+        started = time.perf_counter()
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self._template(name)
+        elapsed = (time.perf_counter() - started) * 1000
+        logger.info(f"Se compilaron {len(names)} templates en {elapsed:.1f} ms.")
+
+    def _template(self, name: str) -> "Template":
+        # Con auto_reload se delega en Jinja, que revisa si el archivo cambió
+        if self.auto_reload:
+            return self.env.get_template(name)
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def render(self, name: str, **context: Any) -> str:
+        """Renderiza el template `name` con `context`."""
+        started = time.perf_counter()
+        html = self._template(name).render(**context)
+        self._record(name, time.perf_counter() - started)
+        return html
+
+    def fragment(self, name: str, key: str, **context: Any) -> Markup:
+        """
+        Renderiza el fragmento `name` o lo toma de la caché si ya se renderizó
+        para `key` con el mismo `context`.
+        """
+        cache_key = (name, key)
+        with self._lock:
+            entry = self._fragments.get(cache_key)
+            if entry is not None and entry[0] == context:
+                self._fragments.move_to_end(cache_key)
+                self.fragment_hits += 1
+                return entry[1]
+            self.fragment_misses += 1
+        html = Markup(self.render(name, **context))
+        with self._lock:
+            self._fragments[cache_key] = (context, html)
+            self._fragments.move_to_end(cache_key)
+            while len(self._fragments) > self.fragment_cache_size:
+                self._fragments.popitem(last=False)
+        return html
+
+    def _record(self, name: str, elapsed: float):
+        with self._lock:
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.fragment_hits + self.fragment_misses
+            return {
+                "auto_reload": self.auto_reload,
+                "templates": len(self._templates),
+                "fragments": {
+                    "entries": len(self._fragments),
+                    "max_entries": self.fragment_cache_size,
+                    "hits": self.fragment_hits,
+                    "misses": self.fragment_misses,
+                    "hit_ratio": self.fragment_hits / lookups if lookups else 0.0,
+                },
+                "renders": {
+                    name: {
+                        "count": count,
+                        "avg_ms": total * 1000 / count,
+                        "max_ms": longest * 1000,
+                    }
+                    for name, (count, total, longest) in self._timings.items()
+                },
+            }
+
+
+def render_contact_emails(
+    contact_name: str,
+    contact_email: str,
+    contact_message: str,
+    car: Optional[dict] = None,
+    plan: Optional[dict] = None,
+) -> tuple[str, str]:
+    """Devuelve el HTML del correo a la empresa y el de confirmación al cliente."""
+    context = {
+        "contact_name": contact_name,
+        "contact_email": contact_email,
+        "contact_message": contact_message,
+    }
+    rendered = []
+    for audience in ("company", "customer"):
+        car_block = plan_block = None
+        if car:
+            car_block = renderer.fragment(
+                f"fragments/{audience}_car.html", car["code"], car=car
+            )
+        if plan:
+            plan_block = renderer.fragment(
+                f"fragments/{audience}_plan.html", plan["name"], plan=plan
+            )
+        rendered.append(
+            renderer.render(
+                f"email_to_{audience}.html",
+                car_block=car_block,
+                plan_block=plan_block,
+                **context,
+            )
+        )
+    return rendered[0], rendered[1]
+
+
+renderer = TemplateRenderer(
+    directory=TEMPLATES_DIR,
+    auto_reload=TemplateConfig.AUTO_RELOAD,
+    bytecode_cache_dir=TemplateConfig.BYTECODE_CACHE_DIR,
+    fragment_cache_size=TemplateConfig.FRAGMENT_CACHE_SIZE,
+)
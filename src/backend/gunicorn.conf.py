@@ -0,0 +1,38 @@
+# Configuración de gunicorn para producción: `gunicorn main:app`
+# Los valores se leen de las variables de entorno a través de AppConfig.
+from core.config import AppConfig, EmailConfig, ImageConfig
+
+bind = AppConfig.BIND
+workers = AppConfig.WORKERS
+worker_class = "core.server.UvicornWorker"
+backlog = AppConfig.BACKLOG
+keepalive = AppConfig.KEEPALIVE
+timeout = AppConfig.WORKER_TIMEOUT
+# Tiempo para vaciar las solicitudes en curso y luego los trabajos pendientes
+graceful_timeout = AppConfig.GRACEFUL_TIMEOUT or int(
+    AppConfig.DRAIN_TIMEOUT
+    + EmailConfig.SHUTDOWN_TIMEOUT
+    + ImageConfig.SHUTDOWN_TIMEOUT
+    + 5
+)
+max_requests = AppConfig.MAX_REQUESTS
+max_requests_jitter = AppConfig.MAX_REQUESTS_JITTER
+# La aplicación se importa una sola vez en el proceso principal y los workers
+# la heredan con el fork (arranque más rápido y memoria compartida)
+preload_app = True
+
+
+def on_starting(server):
+    """Crea las tablas y las migraciones una sola vez, antes de los workers"""
+    from core import db
+
+    db.init_db()
+    # Los workers no deben heredar conexiones abiertas
+    for current in {db.engine, db.read_engine}:
+        current.dispose()
+
+
+def post_fork(server, worker):
+    from core import db
+
+    db.reset_engines_after_fork()
@@ -1,25 +1,70 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import ORJSONResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
+from controllers.car import CarController, image_pipeline, image_sweeper
 from core import db
-from core.config import AppConfig
-from routers import car, contact
-import uvicorn
+from core.config import AppConfig, EmailConfig, ImageConfig
+from core.logger import configure_library_loggers
+from core.metrics import MetricsMiddleware
+from core.outbox import email_dispatcher
+from core.static import ImageFiles
+from core.templates import renderer
+from routers import car, contact, metrics, quote
+import asyncio
 import os
 
-
 # Asegurar que existan los directorios necesarios
 os.makedirs(AppConfig.IMAGES_DIR, exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Con el servidor ya iniciado (y sus loggers configurados)
+    configure_library_loggers()
+    # Compilar los templates de los correos en segundo plano: no demoran la
+    # primera respuesta
+    asyncio.get_running_loop().run_in_executor(None, renderer.warm)
+    # Retomar periódicamente las imágenes pendientes sin reserva vigente (de
+    # una ejecución anterior o de otro worker); cada una la toma un solo
+    # proceso. El pipeline de imágenes se inicia con el primer trabajo.
+    image_sweeper.start()
+    # Índice en memoria de vehículos similares, también en segundo plano
+    CarController.start_similarity_index()
+    # El despachador también envía los correos que quedaron en el outbox
+    email_dispatcher.start()
+    yield
+    # Esperar las imágenes en proceso y los correos vencidos antes de apagar
+    await email_dispatcher.stop(timeout=EmailConfig.SHUTDOWN_TIMEOUT)
+    await image_sweeper.stop()
+    unfinished = image_pipeline.stop(timeout=ImageConfig.SHUTDOWN_TIMEOUT)
+    # Las que no llegaron a procesarse quedan libres para otro proceso
+    CarController.release_image_claims(unfinished)
+    await db.dispose_engines()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=AppConfig.TITLE,
     description=AppConfig.DESCRIPTION,
     version=AppConfig.VERSION,
     debug=AppConfig.DEBUG,
+    # Las respuestas JSON se serializan con orjson
+    default_response_class=ORJSONResponse,
 )
 
 app.include_router(car.router)
 app.include_router(contact.router)
+app.include_router(quote.router)
+if AppConfig.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router)
+# Las imágenes de los vehículos se montan antes que el resto de /static
+app.mount(
+    AppConfig.IMAGES_URL,
+    ImageFiles(directory=AppConfig.IMAGES_DIR),
+    name="images",
+)
 app.mount(
     AppConfig.STATIC_URL,
     StaticFiles(directory=AppConfig.STATIC_DIR),
@@ -32,6 +77,10 @@ def root():
     return RedirectResponse(url="/docs")
 
 
+# Desarrollo: un solo proceso que se reinicia con cada cambio. En producción
+# se usa `gunicorn main:app` (ver gunicorn.conf.py).
 if __name__ == "__main__":
+    import uvicorn
+
     db.init_db()
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,7 +1,18 @@
+from datetime import datetime
 from pydantic import AnyUrl, BaseModel, computed_field
 from typing import Optional, List, Union
 from sqlmodel import SQLModel, Field, UniqueConstraint, Column
-from sqlalchemy import JSON
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    Index,
+    String,
+    func,
+    literal_column,
+    type_coerce,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+from core.config import DatabaseConfig
 
 
 # Modelos de características simplificados
@@ -61,12 +72,37 @@ class CarCreate(CarBase):
         return f"{self.brand.lower()}-{self.model.lower()}"
 
 
+class ImageStatus:
+    """Estados del procesamiento de la imagen de un vehículo"""
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class ImageVariants(BaseModel):
+    """Variantes de la imagen listas para usar en `srcset`"""
+
+    webp: Optional[str] = Field(
+        default=None, description="srcset WebP (p. ej. 'url 320w, url 640w')"
+    )
+    avif: Optional[str] = Field(default=None, description="srcset AVIF")
+    widths: List[int] = Field(default=[], description="Anchos disponibles")
+
+
 class CarRead(CarBase):
     id: int
     code: str
     image: Optional[str] = Field(
         default=None, description="URL de la imagen del vehículo"
     )
+    image_status: Optional[str] = Field(
+        default=None,
+        description="Estado de la imagen (pending, ready, failed)",
+    )
+    image_variants: Optional[ImageVariants] = Field(
+        default=None, description="Variantes responsivas de la imagen"
+    )
     features: Optional[CarFeatures] = Field(
         default=None, description="Características del vehículo"
     )
@@ -74,13 +110,102 @@ class CarRead(CarBase):
     model_config = {"from_attributes": True}
 
 
+class CarFilters(BaseModel):
+    """Filtros del catálogo (compartidos por los endpoints de listados)"""
+
+    code: Optional[str] = Field(
+        default=None, description="Filtrar por código del vehículo"
+    )
+    search: Optional[str] = Field(
+        default=None, description="Filtrar por término de búsqueda"
+    )
+    brand: Optional[str] = Field(default=None, description="Filtrar por marca")
+    model: Optional[str] = Field(default=None, description="Filtrar por modelo")
+    year: Optional[int] = Field(default=None, description="Filtrar por año")
+    year_min: Optional[int] = Field(default=None, description="Año mínimo")
+    year_max: Optional[int] = Field(default=None, description="Año máximo")
+    price_min: Optional[float] = Field(default=None, ge=0, description="Precio mínimo")
+    price_max: Optional[float] = Field(default=None, ge=0, description="Precio máximo")
+    km_min: Optional[int] = Field(default=None, ge=0, description="Kilómetros mínimos")
+    km_max: Optional[int] = Field(default=None, ge=0, description="Kilómetros máximos")
+    fuel_type: Optional[str] = Field(
+        default=None, description="Filtrar por tipo de combustible"
+    )
+    transmission: Optional[str] = Field(
+        default=None, description="Filtrar por tipo de transmisión"
+    )
+    body_type: Optional[str] = Field(
+        default=None, description="Filtrar por tipo de carrocería"
+    )
+    passengers: Optional[int] = Field(
+        default=None, ge=1, le=9, description="Filtrar por capacidad de pasajeros"
+    )
+
+
 class CarResponse(BaseModel):
     total: int
     offset: int
     limit: int
+    next_cursor: Optional[str] = Field(
+        default=None, description="Cursor opaco para pedir la página siguiente"
+    )
     items: List[CarRead]  # ahora usamos CarRead con from_attributes
 
 
+class FacetCount(BaseModel):
+    value: Union[int, str]
+    count: int
+
+
+class RangeFacet(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class CarFacets(BaseModel):
+    """Opciones y conteos de los filtros del catálogo"""
+
+    total: int
+    brands: List[FacetCount]
+    years: List[FacetCount]
+    fuel_types: List[FacetCount]
+    transmissions: List[FacetCount]
+    body_types: List[FacetCount]
+    price: RangeFacet
+    km: RangeFacet
+
+
+class ExportFormat:
+    """Formatos de exportación del inventario"""
+
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class BulkItemStatus:
+    """Resultado de cada vehículo en una importación masiva"""
+
+    CREATED = "created"
+    CONFLICT = "conflict"
+    INVALID = "invalid"
+
+
+class BulkItemResult(BaseModel):
+    index: int = Field(description="Posición del vehículo en el archivo importado")
+    code: Optional[str] = None
+    status: str = Field(description="created, conflict o invalid")
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkImportResponse(BaseModel):
+    total: int
+    created: int
+    conflicts: int
+    invalid: int
+    items: List[BulkItemResult]
+
+
 # Modelo de tabla (DB)
 class Car(CarBase, table=True):
     __tablename__ = "car"
@@ -95,7 +220,105 @@ class Car(CarBase, table=True):
         default=None,
         description="Nombre del archivo de imagen (guardado en /static/data)",
     )
+    image_status: Optional[str] = Field(
+        default=None, max_length=20, description="Estado de la imagen"
+    )
+    image_source: Optional[str] = Field(
+        default=None, description="URL de origen de la imagen"
+    )
+    image_error: Optional[str] = Field(
+        default=None, description="Error del último procesamiento de la imagen"
+    )
+    image_variants: Optional[dict] = Field(
+        default=None,
+        sa_column=Column(JSON),
+        description="Anchos y formatos de las variantes generadas",
+    )
+    image_claimed_until: Optional[datetime] = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),
+        description="Hasta cuándo un proceso tiene reservada la imagen pendiente",
+    )
     features: Optional[dict] = Field(
-        default=None, sa_column=Column(JSON), description="Características del vehículo"
+        default=None,
+        # En PostgreSQL se guarda como JSONB para poder indexarlo con GIN
+        sa_column=Column(JSON().with_variant(JSONB(), "postgresql")),
+        description="Características del vehículo",
     )
     id: Optional[int] = Field(default=None, primary_key=True)
+
+
+# Campos de `features` que se pueden filtrar desde el catálogo
+FILTERABLE_FEATURES = ("fuel_type", "transmission", "body_type", "passengers")
+# Los de texto se comparan sin distinguir mayúsculas, como marca y modelo
+TEXT_FEATURES = ("fuel_type", "transmission", "body_type")
+
+IS_POSTGRES = DatabaseConfig.DIALECT == "postgresql"
+
+
+def _feature_path(name: str, postgres: bool):
+    # La ruta va como literal (no como parámetro) para que el motor reconozca
+    # la misma expresión que la del índice y lo use
+    if postgres:
+        return Car.features.op("->>", return_type=String)(literal_column(f"'{name}'"))
+    return func.json_extract(Car.features, literal_column(f"'$.{name}'"))
+
+
+def feature_column(name: str):
+    """Expresión que extrae un campo del JSON `features`"""
+    return _feature_path(name, IS_POSTGRES)
+
+
+def equals_ignore_case(column, value: str):
+    """Comparación exacta sin distinguir mayúsculas que aprovecha los índices"""
+    if IS_POSTGRES:
+        return func.lower(column) == func.lower(value)
+    return column.collate("NOCASE") == value
+
+
+def feature_equals(name: str, value):
+    """
+    Condición `features.<name> == value`. Los campos de texto no distinguen
+    mayúsculas (con la misma expresión que su índice). En PostgreSQL los
+    demás se expresan como contención (`features @> {...}`) para usar el
+    índice GIN.
+    """
+    if name in TEXT_FEATURES:
+        return equals_ignore_case(feature_column(name), value)
+    if IS_POSTGRES:
+        return type_coerce(Car.features, JSONB).contains({name: value})
+    return feature_column(name) == value
+
+
+# Índices del catálogo. Los que dependen del motor solo se crean en ese motor.
+Index("ix_car_year", Car.year)
+Index("ix_car_price", Car.price)
+Index("ix_car_km", Car.km)
+# Imágenes pendientes, por vencimiento de su reserva (índice parcial)
+Index(
+    "ix_car_image_pending",
+    Car.image_claimed_until,
+    sqlite_where=Car.image_status == ImageStatus.PENDING,
+    postgresql_where=Car.image_status == ImageStatus.PENDING,
+)
+# SQLite: marca, modelo y características de texto sin distinguir mayúsculas
+Index("ix_car_brand", Car.brand.collate("NOCASE")).ddl_if(dialect="sqlite")
+Index("ix_car_model", Car.model.collate("NOCASE")).ddl_if(dialect="sqlite")
+for _feature in FILTERABLE_FEATURES:
+    _expression = _feature_path(_feature, postgres=False)
+    if _feature in TEXT_FEATURES:
+        _expression = _expression.collate("NOCASE")
+    Index(f"ix_car_{_feature}", _expression).ddl_if(dialect="sqlite")
+# PostgreSQL: lower() para marca y modelo, y un índice GIN sobre el JSONB
+Index("ix_car_brand_lower", func.lower(Car.brand)).ddl_if(dialect="postgresql")
+Index("ix_car_model_lower", func.lower(Car.model)).ddl_if(dialect="postgresql")
+for _feature in TEXT_FEATURES:
+    Index(
+        f"ix_car_{_feature}_lower", func.lower(_feature_path(_feature, postgres=True))
+    ).ddl_if(dialect="postgresql")
+Index(
+    "ix_car_features",
+    Car.features,
+    postgresql_using="gin",
+    postgresql_ops={"features": "jsonb_path_ops"},
+).ddl_if(dialect="postgresql")
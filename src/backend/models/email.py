@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import DateTime
+from sqlmodel import SQLModel, Field, Index
+from models.inventory import utc_now
+
+
+class EmailStatus:
+    """Estados de un correo en el outbox"""
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+# Modelo de tabla (DB)
+class EmailOutbox(SQLModel, table=True):
+    """
+    Correo pendiente de envío. Se guarda dentro de la solicitud y lo envía el
+    despachador en segundo plano, con reintentos. `idempotency_key` evita
+    duplicados si el cliente reintenta la solicitud o si un envío se repite.
+    """
+
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+        {"extend_existing": True},
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    idempotency_key: str = Field(max_length=120, unique=True)
+    to_email: str = Field(max_length=320)
+    subject: str
+    html: str
+    status: str = Field(default=EmailStatus.PENDING, max_length=20)
+    attempts: int = Field(default=0, description="Intentos de envío realizados")
+    next_attempt_at: datetime = Field(
+        default_factory=utc_now,
+        # Con zona horaria: se compara con la hora actual en UTC
+        sa_type=DateTime(timezone=True),
+        description="Fecha del próximo intento",
+    )
+    last_error: Optional[str] = Field(default=None)
+    provider_id: Optional[str] = Field(
+        default=None, max_length=100, description="ID asignado por Resend"
+    )
+    created_at: datetime = Field(default_factory=utc_now)
+    sent_at: Optional[datetime] = Field(default=None)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field, Column
+from sqlalchemy import JSON
+from models.inventory import utc_now
+
+
+# Modelo de tabla (DB)
+class ImageBlob(SQLModel, table=True):
+    """
+    Imagen guardada por contenido: el nombre del archivo es el hash de los
+    bytes de origen y de los parámetros de conversión. `refcount` cuenta los
+    vehículos (o trabajos en curso) que la usan; en cero se borran los archivos.
+    """
+
+    __tablename__ = "image_blob"
+    filename: str = Field(primary_key=True, max_length=80)
+    refcount: int = Field(default=0, description="Referencias a la imagen")
+    variants: Optional[dict] = Field(
+        default=None,
+        sa_column=Column(JSON),
+        description="Anchos y formatos de las variantes generadas",
+    )
+    created_at: datetime = Field(default_factory=utc_now)
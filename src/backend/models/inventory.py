@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+from sqlmodel import SQLModel, Field
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Modelo de tabla (DB)
+class Inventory(SQLModel, table=True):
+    """
+    Versión del inventario (una sola fila). Se incrementa en cada alta,
+    modificación o baja de vehículos y se usa como validador HTTP (ETag).
+    """
+
+    __tablename__ = "inventory"
+    id: int = Field(default=1, primary_key=True)
+    revision: int = Field(default=0, description="Revisión actual del inventario")
+    updated_at: datetime = Field(
+        default_factory=utc_now, description="Fecha de la última modificación"
+    )
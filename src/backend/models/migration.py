@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from models.inventory import utc_now
+
+
+# Modelo de tabla (DB)
+class SchemaVersion(SQLModel, table=True):
+    """Migraciones del esquema ya aplicadas (una fila por versión)"""
+
+    __tablename__ = "schema_version"
+    version: int = Field(primary_key=True)
+    description: str = Field(description="Descripción de la migración")
+    applied_at: datetime = Field(
+        default_factory=utc_now, description="Fecha en que se aplicó"
+    )
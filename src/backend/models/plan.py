@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
+from typing import List
 
 
 class FinancingPlan(BaseModel):
@@ -24,3 +25,62 @@ class FinancingPlan(BaseModel):
             }
         },
     )
+
+
+class PlanTerms(BaseModel):
+    """Condiciones de un plan de financiación para calcular cotizaciones"""
+
+    id: str = Field(description="Identificador del plan")
+    name: str = Field(description="Nombre del plan")
+    rate: float = Field(ge=0, description="Tasa nominal anual (%)")
+    months: int = Field(gt=0, le=360, description="Plazo en meses")
+    down_payment: float = Field(ge=0, lt=100, description="Porcentaje de anticipo")
+
+
+# Planes ofrecidos (los mismos que muestra la página de financiación)
+FINANCING_PLANS = (
+    PlanTerms(id="basic", name="Plan Básico", rate=12, months=36, down_payment=20),
+    PlanTerms(id="premium", name="Plan Premium", rate=8, months=60, down_payment=15),
+    PlanTerms(id="promo", name="Plan Promocional", rate=0, months=24, down_payment=30),
+)
+
+
+class Quote(BaseModel):
+    """Cotización de un vehículo con un plan"""
+
+    plan: str = Field(description="Identificador del plan")
+    down_payment: float = Field(description="Anticipo")
+    financed: float = Field(description="Monto financiado")
+    installment: float = Field(description="Cuota mensual fija (capital e interés)")
+    total_interest: float = Field(description="Intereses del préstamo")
+    total_cost: float = Field(
+        description="Costo total: anticipo, cuotas, IVA sobre intereses y gastos"
+    )
+    cft: float = Field(description="Costo financiero total efectivo anual (%)")
+
+
+class CarQuotes(BaseModel):
+    """Cotizaciones de un vehículo con todos los planes"""
+
+    code: str
+    price: float = Field(description="Precio cotizado (el promocional si existe)")
+    quotes: List[Quote]
+
+
+class QuoteMatrixItem(BaseModel):
+    code: str
+    price: float
+    installments: List[float] = Field(
+        description="Cuota mensual con cada plan, en el orden de `plans`"
+    )
+    from_installment: float = Field(description="La cuota más baja entre los planes")
+
+
+class QuoteMatrix(BaseModel):
+    """Cuotas de cada vehículo del catálogo con cada plan"""
+
+    total: int
+    offset: int
+    limit: int
+    plans: List[PlanTerms]
+    items: List[QuoteMatrixItem]
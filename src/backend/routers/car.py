@@ -1,19 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
-from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Annotated, Awaitable, Callable, Literal
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from urllib.parse import urlencode
+import hashlib
+import json
 from controllers.car import CarController
 from core import db
-from models.car import CarCreate, CarResponse
+from core.cache import listing_cache, listing_flight
+from core.config import AppConfig, SimilarityConfig
+from core.ratelimit import RateLimit, rate_limiter
+from core.similarity import similarity_index
+from pydantic import ValidationError
+from models.car import (
+    BulkImportResponse,
+    BulkItemResult,
+    BulkItemStatus,
+    CarCreate,
+    CarFacets,
+    CarFilters,
+    CarResponse,
+    ExportFormat,
+)
+from models.inventory import Inventory
 
 # API ROUTER CLASIFICADO EN DOCS
 router = APIRouter(
     tags=["cars"],
 )
 
+# Límite por IP de las consultas del catálogo
+limit_cars = rate_limiter.by_ip("cars", RateLimit.parse(AppConfig.RATE_LIMIT_CARS_IP))
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evalúa If-None-Match (o If-Modified-Since si no viene el primero)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            if since.tzinfo is None:
+                # Fechas sin zona (o con -0000): las fechas HTTP están en UTC
+                since = since.replace(tzinfo=timezone.utc)
+            return last_modified.replace(microsecond=0) <= since
+        except (TypeError, ValueError):
+            return False
+    return False
+
 
-@router.get("/cars", response_model=CarResponse)
-def get_cars(
-    response: Response,
-    session: Annotated[db.Session, Depends(db.get_session)],
+async def _json_response(
+    request: Request, version: Inventory, build: Callable[[], Awaitable[bytes]]
+) -> Response:
+    """
+    Respuesta JSON con validadores HTTP. El ETag depende de la revisión del
+    inventario y de los parámetros de la consulta, así que si el cliente ya
+    tiene esa versión se responde 304 sin leer ni serializar ningún vehículo.
+    """
+    query = urlencode(sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{request.url.path}?{query}".encode()).hexdigest()[:16]
+    etag = f'"{version.revision}-{digest}"'
+    last_modified = version.updated_at
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    headers = {
+        "Cache-Control": f"public, max-age={AppConfig.CACHE_MAX_AGE}",
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    content = await build()
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+async def get_car_filters(
     code: Annotated[
         str | None, Query(description="Filtrar por código del vehículo")
     ] = None,
@@ -23,50 +88,280 @@ def get_cars(
     brand: Annotated[str | None, Query(description="Filtrar por marca")] = None,
     model: Annotated[str | None, Query(description="Filtrar por modelo")] = None,
     year: Annotated[int | None, Query(description="Filtrar por año")] = None,
+    year_min: Annotated[int | None, Query(description="Año mínimo")] = None,
+    year_max: Annotated[int | None, Query(description="Año máximo")] = None,
+    price_min: Annotated[float | None, Query(ge=0, description="Precio mínimo")] = None,
+    price_max: Annotated[float | None, Query(ge=0, description="Precio máximo")] = None,
+    km_min: Annotated[int | None, Query(ge=0, description="Kilómetros mínimos")] = None,
+    km_max: Annotated[int | None, Query(ge=0, description="Kilómetros máximos")] = None,
+    fuel_type: Annotated[
+        str | None, Query(description="Filtrar por tipo de combustible")
+    ] = None,
+    transmission: Annotated[
+        str | None, Query(description="Filtrar por tipo de transmisión")
+    ] = None,
+    body_type: Annotated[
+        str | None, Query(description="Filtrar por tipo de carrocería")
+    ] = None,
+    passengers: Annotated[
+        int | None,
+        Query(ge=1, le=9, description="Filtrar por capacidad de pasajeros"),
+    ] = None,
+) -> CarFilters:
+    """Dependencia que agrupa los filtros del catálogo en un CarFilters"""
+    return CarFilters(
+        code=code,
+        search=search,
+        brand=brand,
+        model=model,
+        year=year,
+        year_min=year_min,
+        year_max=year_max,
+        price_min=price_min,
+        price_max=price_max,
+        km_min=km_min,
+        km_max=km_max,
+        fuel_type=fuel_type,
+        transmission=transmission,
+        body_type=body_type,
+        passengers=passengers,
+    )
+
+
+@router.get("/cars", response_model=CarResponse, dependencies=[Depends(limit_cars)])
+async def get_cars(
+    request: Request,
+    session: Annotated[db.AsyncSession, Depends(db.get_async_read_session)],
+    filters: Annotated[CarFilters, Depends(get_car_filters)],
     offset: int = Query(0, ge=0, description="Número de registros a saltar"),
     limit: int = Query(
         100, ge=1, le=1000, description="Número máximo de registros a devolver"
     ),
+    cursor: Annotated[
+        str | None,
+        Query(description="Cursor de la página siguiente (reemplaza a offset)"),
+    ] = None,
 ):
-    # Añadir headers de caché para mejorar rendimiento
-    response.headers["Cache-Control"] = "public, max-age=300"  # 5 minutos de caché
+    version = await CarController.get_inventory_version(session)
+    return await _json_response(
+        request,
+        version,
+        lambda: CarController.get_cars_json(
+            filters=filters,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+            revision=version.revision,
+        ),
+    )
 
-    cars = CarController.get_cars(
-        session=session,
-        code=code,
-        search=search,
-        brand=brand,
-        model=model,
-        year=year,
-        offset=offset,
-        limit=limit,
+
+@router.get(
+    "/cars/facets", response_model=CarFacets, dependencies=[Depends(limit_cars)]
+)
+async def get_car_facets(
+    request: Request,
+    session: Annotated[db.AsyncSession, Depends(db.get_async_read_session)],
+    filters: Annotated[CarFilters, Depends(get_car_filters)],
+):
+    version = await CarController.get_inventory_version(session)
+    return await _json_response(
+        request,
+        version,
+        lambda: CarController.get_facets_json(
+            filters=filters, revision=version.revision
+        ),
+    )
+
+
+@router.get(
+    "/cars/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(limit_cars)],
+    responses={
+        200: {
+            "content": {
+                "application/x-ndjson": {"schema": {"type": "string"}},
+                "text/csv": {"schema": {"type": "string"}},
+            },
+            "description": "Inventario filtrado, un vehículo por línea",
+        }
+    },
+)
+async def export_cars(
+    filters: Annotated[CarFilters, Depends(get_car_filters)],
+    format: Annotated[
+        Literal["ndjson", "csv"], Query(description="Formato de exportación")
+    ] = ExportFormat.NDJSON,
+):
+    """Exporta el inventario completo (con los mismos filtros que GET /cars)"""
+    media_type = "text/csv" if format == ExportFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        CarController.export_cars(filters, format),
+        media_type=f"{media_type}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="cars.{format}"'},
+    )
+
+
+@router.get("/cars/cache", include_in_schema=False)
+async def get_cache_stats():
+    """Estadísticas de la caché de listados y de las consultas compartidas"""
+    return {
+        **listing_cache.stats(),
+        "single_flight": listing_flight.stats(),
+        "similarity_index": similarity_index.stats(),
+    }
+
+
+@router.get(
+    "/cars/{code}/similar",
+    response_model=CarResponse,
+    dependencies=[Depends(limit_cars)],
+)
+async def get_similar_cars(
+    code: str,
+    request: Request,
+    session: Annotated[db.AsyncSession, Depends(db.get_async_read_session)],
+    k: int = Query(
+        6,
+        ge=1,
+        le=SimilarityConfig.MAX_K,
+        description="Cantidad de vehículos similares a devolver",
+    ),
+):
+    """
+    Vehículos más parecidos por precio, kilómetros, año, marca y
+    características, del más cercano al más lejano.
+    """
+    version = await CarController.get_inventory_version(session)
+    return await _json_response(
+        request,
+        version,
+        lambda: CarController.get_similar_cars_json(code, k, version.revision),
     )
-    return CarResponse(total=len(cars), offset=offset, limit=limit, items=cars)
 
 
 @router.post("/cars", response_model=CarResponse)
-def create_car(car: CarCreate, session: Annotated[db.Session, Depends(db.get_session)]):
+async def create_car(
+    car: CarCreate,
+    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+):
     try:
-        new_car = CarController.create_car(session, car)
+        new_car = await CarController.create_car(session, car)
         return CarResponse(total=1, offset=0, limit=1, items=[new_car])
     except HTTPException as e:
         raise e
 
 
+async def _read_json_records(request: Request):
+    """Recorre los vehículos de un cuerpo JSON (lista) o NDJSON (uno por línea)"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        # NDJSON se procesa a medida que llega, sin leer todo el cuerpo
+        buffer = b""
+        index = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, line
+                    index += 1
+        if buffer.strip():
+            yield index, buffer
+        return
+    try:
+        records = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="JSON inválido.") from e
+    if not isinstance(records, list):
+        raise HTTPException(
+            status_code=400, detail="Se esperaba una lista de vehículos."
+        )
+    for index, record in enumerate(records):
+        yield index, record
+
+
+async def _import_batch(
+    batch: list[tuple[int, CarCreate]],
+) -> list[BulkItemResult]:
+    # Una sesión (y una transacción) por lote
+    async with db.AsyncSession(db.async_engine, expire_on_commit=False) as session:
+        return await CarController.bulk_create_cars(session, batch)
+
+
+@router.post(
+    "/cars/bulk",
+    response_model=BulkImportResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/CarCreate"},
+                    }
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_create_cars(request: Request):
+    """
+    Importa vehículos en lote desde una lista JSON o un stream NDJSON. Cada
+    vehículo se valida por separado y el resultado se informa por ítem.
+    """
+    results: list[BulkItemResult] = []
+    batch: list[tuple[int, CarCreate]] = []
+    async for index, record in _read_json_records(request):
+        try:
+            if isinstance(record, bytes):
+                car = CarCreate.model_validate_json(record)
+            else:
+                car = CarCreate.model_validate(record)
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc']) or 'body'}: {err['msg']}"
+                for err in e.errors()
+            )
+            results.append(
+                BulkItemResult(index=index, status=BulkItemStatus.INVALID, error=error)
+            )
+            continue
+        batch.append((index, car))
+        if len(batch) >= AppConfig.BULK_BATCH_SIZE:
+            results += await _import_batch(batch)
+            batch = []
+    if batch:
+        results += await _import_batch(batch)
+
+    results.sort(key=lambda result: result.index)
+    statuses = [result.status for result in results]
+    return BulkImportResponse(
+        total=len(results),
+        created=statuses.count(BulkItemStatus.CREATED),
+        conflicts=statuses.count(BulkItemStatus.CONFLICT),
+        invalid=statuses.count(BulkItemStatus.INVALID),
+        items=results,
+    )
+
+
 @router.put("/cars/{car_id}", response_model=CarResponse)
-def update_car(
+async def update_car(
     car_id: int,
     car_data: CarCreate,
-    session: Annotated[db.Session, Depends(db.get_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
 ):
-    updated_car = CarController.update_car(session, car_id, car_data)
+    updated_car = await CarController.update_car(session, car_id, car_data)
     return CarResponse(total=1, offset=0, limit=1, items=[updated_car])
 
 
 @router.delete("/cars/{car_id}", status_code=204)
-def delete_car(
+async def delete_car(
     car_id: int,
-    session: Annotated[db.Session, Depends(db.get_session)],
+    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
 ):
-    CarController.delete_car(session, car_id)
+    await CarController.delete_car(session, car_id)
     return
@@ -1,77 +1,87 @@
-from fastapi import APIRouter, HTTPException, Body
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from pathlib import Path
-from core import email
-from core.config import EmailConfig
+from fastapi import APIRouter, Depends, Header, HTTPException, Body, Response
+from typing import Annotated, Optional
+import hashlib
+import uuid
+from core import db
+from core.config import AppConfig, EmailConfig
+from core.email import EmailMessage
+from core.outbox import enqueue_emails
+from core.ratelimit import RateLimit, rate_limiter
+from core.templates import render_contact_emails, renderer
 from core.logger import logger
 from models.contact import ContactRequest
 
-
 router = APIRouter(
     tags=["contact"],
 )
 
-# Configurar Jinja2
-templates_dir = Path(__file__).parent.parent / "templates"
-jinja_env = Environment(
-    loader=FileSystemLoader(templates_dir),
-    autoescape=select_autoescape(["html", "xml"]),
+CUSTOMER_SUBJECT = "Hemos recibido tu mensaje de contacto"
+
+# Cada contacto dispara dos envíos pagos: se limita por IP y por remitente
+CONTACT_EMAIL_LIMIT = RateLimit.parse(AppConfig.RATE_LIMIT_CONTACT_EMAIL)
+limit_contact = rate_limiter.by_ip(
+    "contact", RateLimit.parse(AppConfig.RATE_LIMIT_CONTACT_IP)
 )
 
 
-@router.post("/contact", status_code=204)
-def send_contact_email(request: ContactRequest = Body(...)):
+@router.post("/contact", status_code=202, dependencies=[Depends(limit_contact)])
+async def send_contact_email(
+    session: Annotated[db.AsyncSession, Depends(db.get_async_session)],
+    request: ContactRequest = Body(...),
+    idempotency_key: Optional[str] = Header(
+        default=None,
+        max_length=80,
+        description="Clave para que un reintento del formulario no duplique los correos",
+    ),
+):
+    """
+    Guarda los correos del contacto en el outbox y responde 202: el envío se
+    hace en segundo plano, con reintentos.
+    """
+    sender = request.contact_email.strip().lower()
+    await rate_limiter.check("contact-email", sender, CONTACT_EMAIL_LIMIT)
     try:
-        # Preparar datos para los templates
-        car_data_for_template = (
-            request.car_data.model_dump() if request.car_data else None
-        )
-        plan_data_for_template = (
-            request.plan_data.model_dump() if request.plan_data else None
-        )
-
-        # Renderizar template para la empresa
-        company_template = jinja_env.get_template("email_to_company.html")
-        company_html = company_template.render(
+        company_html, customer_html = render_contact_emails(
             contact_name=request.contact_name,
             contact_email=request.contact_email,
             contact_message=request.contact_message,
-            car=car_data_for_template,
-            plan=plan_data_for_template,
-        )
-
-        # Enviar email a la empresa
-        subject = f"Nuevo mensaje de contacto de {request.contact_name}"
-        result = email.send_email(
-            to_email=EmailConfig.TO_EMAIL,
-            subject=subject,
-            html_content=company_html,
+            car=request.car_data.model_dump() if request.car_data else None,
+            plan=request.plan_data.model_dump() if request.plan_data else None,
         )
-        if not result.get("id"):
-            raise HTTPException(
-                status_code=500, detail="No se pudo enviar el correo electrónico."
-            )
 
-        # Renderizar template para el cliente
-        customer_template = jinja_env.get_template("email_to_customer.html")
-        customer_html = customer_template.render(
-            contact_name=request.contact_name,
-            contact_email=request.contact_email,
-            contact_message=request.contact_message,
-            car=car_data_for_template,
-            plan=plan_data_for_template,
-        )
-
-        # Enviar correo de confirmación al cliente
-        confirmation_subject = "Hemos recibido tu mensaje de contacto"
-        email.send_email(
-            to_email=request.contact_email,
-            subject=confirmation_subject,
-            html_content=customer_html,
-        )
+        if idempotency_key:
+            # La clave del cliente vale solo para su remitente: dos personas
+            # que usan la misma clave no comparten correos
+            key = hashlib.sha256(f"{sender}\n{idempotency_key}".encode()).hexdigest()
+        else:
+            key = uuid.uuid4().hex
+        messages = [
+            # Email a la empresa
+            EmailMessage(
+                to_email=EmailConfig.TO_EMAIL,
+                subject=f"Nuevo mensaje de contacto de {request.contact_name}",
+                html=company_html,
+                idempotency_key=f"contact-{key}-company",
+            ),
+            # Correo de confirmación al cliente
+            EmailMessage(
+                to_email=request.contact_email,
+                subject=CUSTOMER_SUBJECT,
+                html=customer_html,
+                idempotency_key=f"contact-{key}-customer",
+            ),
+        ]
+        await enqueue_emails(session, messages)
+        return Response(status_code=202)
     except Exception as e:
-        logger.error("Error al enviar el correo electrónico de contacto.")
+        logger.error("Error al guardar el correo electrónico de contacto.")
         logger.exception(e)
         raise HTTPException(
             status_code=500, detail="Error al enviar el correo electrónico."
         ) from e
+
+
+@router.get("/contact/templates", include_in_schema=False)
+async def get_template_stats():
+    """Tiempos de render de los templates y aciertos de la caché de fragmentos"""
+    return renderer.stats()
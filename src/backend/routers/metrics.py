@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Response
+from controllers.car import image_pipeline
+from core.cache import listing_cache, listing_flight
+from core.metrics import background_jobs_pending, record_cache, registry
+from core.templates import renderer
+
+router = APIRouter(
+    tags=["metrics"],
+)
+
+
+@registry.on_collect
+def collect_stats():
+    """Copia las estadísticas de las cachés y colas al leer /metrics"""
+    listing = listing_cache.stats()
+    record_cache("listing", listing["hits"], listing["misses"])
+    templates = renderer.stats()["fragments"]
+    record_cache("email_fragments", templates["hits"], templates["misses"])
+    # Consultas idénticas que reutilizaron una ejecución en curso
+    flight = listing_flight.stats()
+    record_cache("single_flight", flight["shared"], flight["executions"])
+    background_jobs_pending.set(image_pipeline.pending, queue="images")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Métricas del proceso en el formato de texto de Prometheus"""
+    return Response(
+        content=registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, Query, Request
+from typing import Annotated
+from controllers.car import CarController
+from controllers.quote import QuoteController
+from core import db
+from models.car import CarFilters
+from models.plan import CarQuotes, QuoteMatrix
+from routers.car import _json_response, get_car_filters, limit_cars
+
+# API ROUTER CLASIFICADO EN DOCS
+router = APIRouter(
+    tags=["quotes"],
+)
+
+
+@router.get(
+    "/cars/{code}/quotes",
+    response_model=CarQuotes,
+    dependencies=[Depends(limit_cars)],
+)
+async def get_car_quotes(
+    code: str,
+    session: Annotated[db.AsyncSession, Depends(db.get_async_read_session)],
+):
+    """Anticipo, cuota, costo total y CFT del vehículo con cada plan"""
+    return await QuoteController.get_car_quotes(session, code)
+
+
+@router.get(
+    "/quotes/matrix", response_model=QuoteMatrix, dependencies=[Depends(limit_cars)]
+)
+async def get_quote_matrix(
+    request: Request,
+    session: Annotated[db.AsyncSession, Depends(db.get_async_read_session)],
+    filters: Annotated[CarFilters, Depends(get_car_filters)],
+    offset: int = Query(0, ge=0, description="Número de registros a saltar"),
+    limit: int = Query(
+        100, ge=1, le=1000, description="Número máximo de registros a devolver"
+    ),
+):
+    """Cuota mensual de cada vehículo del catálogo con cada plan ("desde $X/mes")"""
+    version = await CarController.get_inventory_version(session)
+    return await _json_response(
+        request,
+        version,
+        lambda: QuoteController.get_quote_matrix_json(
+            filters=filters, offset=offset, limit=limit, revision=version.revision
+        ),
+    )
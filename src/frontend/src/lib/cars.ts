@@ -1,5 +1,6 @@
 import type { Car, CarAPIResponse } from '../types/car';
 import { API_URL } from "astro:env/server";
+import { clientIpHeaders, type ClientContext } from './clientIp';
 
 const isProd = import.meta.env.PROD;
 
@@ -9,11 +10,12 @@ const domain = API_URL.endsWith('/')
 const apiUrl = `${domain}/cars`
 
 // devolvemos un array o un solo coche según se le pase el código
-export const getCar = async (code?: string): Promise<Car | Car[] | null> => {
+// `client` (Astro o el contexto de la ruta) reenvía la IP del visitante
+export const getCar = async (code?: string, client?: ClientContext): Promise<Car | Car[] | null> => {
   const url = code ? `${apiUrl}?code=${code}` : apiUrl
 
   try {
-    const res = await fetch(url)
+    const res = await fetch(url, { headers: clientIpHeaders(client) })
     if (!res.ok) {
       throw new Error(`HTTP error! status: ${res.status}`)
     }
@@ -22,9 +24,18 @@ export const getCar = async (code?: string): Promise<Car | Car[] | null> => {
     // En desarrollo, agregamos el dominio del backend a las URLs de las imágenes
     // En producción, las URLs son relativas y nginx las sirve correctamente
     if (!isProd) {
+      const withDomain = (url: string) => url.startsWith('/') ? `${domain}${url}` : url
+      // Los srcset son listas "url ancho" separadas por comas
+      const srcsetWithDomain = (srcset?: string | null) =>
+        srcset?.split(', ').map(withDomain).join(', ')
       data.items = data.items.map(car => ({
         ...car,
-        image: car.image.startsWith('/') ? `${domain}${car.image}` : car.image
+        image: withDomain(car.image),
+        image_variants: car.image_variants && {
+          ...car.image_variants,
+          webp: srcsetWithDomain(car.image_variants.webp),
+          avif: srcsetWithDomain(car.image_variants.avif),
+        }
       }))
     }
 
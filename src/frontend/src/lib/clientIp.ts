@@ -0,0 +1,30 @@
+// El servidor de Astro llama al backend directamente (no pasa por nginx), así
+// que el backend ve siempre la IP del contenedor del frontend. Para que los
+// límites por IP del backend cuenten a cada visitante y no al sitio entero,
+// se reenvía la IP del cliente en X-Real-IP en cada llamada.
+
+export interface ClientContext {
+  request: Request;
+  clientAddress?: string;
+}
+
+// IP del visitante: la que nginx puso en X-Real-IP o, sin nginx (desarrollo),
+// la dirección de la conexión
+export const getClientIp = (context: ClientContext): string | null => {
+  const realIp = context.request.headers.get('x-real-ip')?.trim();
+  if (realIp) {
+    return realIp;
+  }
+  try {
+    return context.clientAddress || null;
+  } catch {
+    // clientAddress no está disponible en páginas prerenderizadas
+    return null;
+  }
+}
+
+// Encabezados para reenviar la IP del visitante al backend
+export const clientIpHeaders = (context?: ClientContext): Record<string, string> => {
+  const ip = context && getClientIp(context);
+  return ip ? { 'X-Real-IP': ip } : {};
+}
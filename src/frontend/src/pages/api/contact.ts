@@ -1,7 +1,9 @@
 import type { APIRoute } from 'astro';
 import { API_URL } from "astro:env/server";
+import { clientIpHeaders } from '../../lib/clientIp';
 
-export const POST: APIRoute = async ({ request }) => {
+export const POST: APIRoute = async (context) => {
+  const { request } = context;
   try {
     // Recibir datos como JSON
     const data = await request.json();
@@ -31,6 +33,8 @@ export const POST: APIRoute = async ({ request }) => {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        // El límite de contactos del backend es por IP del visitante
+        ...clientIpHeaders(context),
       },
       body: JSON.stringify(requestBody),
     });
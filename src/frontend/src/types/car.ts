@@ -10,6 +10,13 @@ export interface CarFeatures {
     abs?: boolean; // Frenos ABS
 }
 
+// Variantes responsivas de la imagen (listas para usar en srcset)
+export interface ImageVariants {
+    webp?: string | null;
+    avif?: string | null;
+    widths: number[];
+}
+
 // Tipos para los datos que vienen de la API
 export interface Car {
     id: number;
@@ -22,6 +29,8 @@ export interface Car {
     year: number;
     code: string;
     image: string;
+    image_status?: string | null; // Estado de la imagen: pending, ready, failed
+    image_variants?: ImageVariants | null;
     features?: CarFeatures;
 }
 
@@ -29,5 +38,6 @@ export interface CarAPIResponse {
     total: number;
     offset: number;
     limit: number;
+    next_cursor?: string | null; // Cursor para pedir la página siguiente
     items: Car[];
 }
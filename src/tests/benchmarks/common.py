@@ -0,0 +1,115 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = TESTS_DIR.parent / "backend"
+TEMPLATE_PATH = TESTS_DIR / "cars.json"
+
+
+def prepare_backend(database_url: str = "", cache: bool = True) -> Path:
+    """
+    Configura el entorno del backend para los benchmarks y lo agrega al path.
+    Debe llamarse antes de importar cualquier módulo del backend, porque la
+    configuración se lee al importarlo. Devuelve el directorio temporal de
+    trabajo (base SQLite e imágenes).
+    """
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/bench.db"
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ.pop("DB_READ_REPLICA_PATH", None)
+    # Los correos no salen del proceso y el cliente de carga es una sola IP
+    os.environ["EMAIL_TRANSPORT"] = "fake"
+    os.environ["APP_RATE_LIMIT_ENABLED"] = "false"
+    os.environ["APP_DEBUG"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+    sys.path.insert(0, str(BACKEND_DIR))
+    return workdir
+
+
+def load_inventory(count: int, seed: int = 0) -> int:
+    """Crea las tablas desde cero e inserta `count` vehículos sintéticos"""
+    from inventory import generate_cars
+    from sqlalchemy import insert
+    from sqlmodel import Session
+    from core import db
+    from models.car import Car
+
+    db.create_db_and_tables(drop_existing=True)
+    batch = []
+    with Session(db.engine) as session:
+        for car in generate_cars(count, seed):
+            car.pop("image", None)
+            car["code"] = f"{car['brand'].lower()}-{car['model'].lower()}"
+            batch.append(car)
+            if len(batch) == 5000:
+                session.execute(insert(Car), batch)
+                batch = []
+        if batch:
+            session.execute(insert(Car), batch)
+        session.commit()
+    return count
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Percentil por el método del rango más cercano (lista ya ordenada)"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: float, errors: int = 0) -> dict:
+    """Resumen de una serie de duraciones (en segundos) para el reporte"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def metadata(**params) -> dict:
+    """Datos para comparar reportes entre commits"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=TESTS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "database": os.environ.get("DATABASE_URL", "").split(":", 1)[0],
+        **params,
+    }
+
+
+def write_report(report: dict, output: str):
+    """Escribe el reporte JSON en `output` ('-' para la salida estándar)"""
+    content = json.dumps(report, indent=2, ensure_ascii=False)
+    if output == "-":
+        print(content)
+    else:
+        Path(output).write_text(content + "\n", encoding="utf-8")
+        print(f"Reporte guardado en {output}", file=sys.stderr)
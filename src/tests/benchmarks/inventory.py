@@ -0,0 +1,63 @@
+import argparse
+import json
+import random
+import sys
+from typing import Iterator
+from common import TEMPLATE_PATH
+
+# Versiones para que cada vehículo tenga un modelo (y un código) distinto
+TRIMS = ("Base", "GL", "GLX", "SE", "LX", "EX", "Sport", "Titanium", "Limited")
+
+
+def generate_cars(count: int, seed: int = 0) -> Iterator[dict]:
+    """
+    Vehículos sintéticos a partir de `cars.json`: misma distribución de
+    marcas, descripciones y características, con año, kilómetros y precio
+    variados. Con la misma semilla se generan siempre los mismos datos.
+    """
+    templates = json.loads(TEMPLATE_PATH.read_text(encoding="utf-8"))
+    rng = random.Random(seed)
+    for index in range(count):
+        template = templates[index % len(templates)]
+        car = json.loads(json.dumps(template))
+        car["model"] = f"{template['model']} {rng.choice(TRIMS)} {index}"
+        car["year"] = rng.randint(2005, 2025)
+        car["km"] = 0 if car["year"] == 2025 else rng.randrange(0, 250_000, 500)
+        car["price"] = round(template["price"] * rng.uniform(0.6, 1.4), -3)
+        car["promotion_price"] = (
+            round(car["price"] * 0.95, -3) if rng.random() < 0.15 else None
+        )
+        if car.get("features"):
+            car["features"]["airbags"] = rng.choice((2, 4, 6, 7))
+        yield car
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Genera un inventario sintético en NDJSON (para import_cars.py)."
+    )
+    parser.add_argument("count", type=int, help="Cantidad de vehículos (p. ej. 10000)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla aleatoria")
+    parser.add_argument(
+        "--no-images", action="store_true", help="Omite las URLs de las imágenes"
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="Archivo de salida ('-' = stdout)"
+    )
+    args = parser.parse_args()
+
+    output = (
+        sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    )
+    try:
+        for car in generate_cars(args.count, args.seed):
+            if args.no_images:
+                car.pop("image", None)
+            output.write(json.dumps(car, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from common import (
+    TEMPLATE_PATH,
+    load_inventory,
+    metadata,
+    prepare_backend,
+    summarize,
+    write_report,
+)
+
+# Proporción de cada tipo de solicitud en la carga
+SCENARIOS = {
+    "list": 0.25,
+    "search": 0.20,
+    "brand": 0.20,
+    "year_range": 0.15,
+    "offset": 0.15,
+    "contact": 0.05,
+}
+
+
+class RequestMix:
+    """Genera solicitudes con la proporción de SCENARIOS y parámetros variados"""
+
+    def __init__(self, count: int, seed: int):
+        templates = json.loads(TEMPLATE_PATH.read_text(encoding="utf-8"))
+        self.brands = sorted({car["brand"] for car in templates})
+        # Búsquedas parciales, como mientras el usuario escribe
+        self.terms = sorted(
+            {car["brand"][:4].lower() for car in templates}
+            | {f"{car['brand']} {car['model'][:3]}".lower() for car in templates}
+        )
+        self.pages = max(1, count // 20)
+        self.rng = random.Random(seed)
+        self.names = list(SCENARIOS)
+        self.weights = list(SCENARIOS.values())
+        self.contacts = 0
+
+    def next(self) -> tuple[str, str, str, dict]:
+        """Escenario, método, URL y cuerpo JSON de la próxima solicitud"""
+        rng = self.rng
+        scenario = rng.choices(self.names, self.weights)[0]
+        if scenario == "list":
+            return scenario, "GET", "/cars?limit=20", None
+        if scenario == "search":
+            return scenario, "GET", f"/cars?search={rng.choice(self.terms)}", None
+        if scenario == "brand":
+            return scenario, "GET", f"/cars?brand={rng.choice(self.brands)}", None
+        if scenario == "year_range":
+            year_min = rng.randint(2005, 2020)
+            url = f"/cars?year_min={year_min}&year_max={year_min + 5}&limit=20"
+            return scenario, "GET", url, None
+        if scenario == "offset":
+            offset = rng.randrange(self.pages) * 20
+            return scenario, "GET", f"/cars?offset={offset}&limit=20", None
+        self.contacts += 1
+        body = {
+            "contact_name": "Cliente de prueba",
+            "contact_email": f"cliente{self.contacts}@example.com",
+            "contact_message": "Hola, quisiera más información sobre el vehículo.",
+        }
+        return scenario, "POST", "/contact", body
+
+
+async def run_load(app, mix: RequestMix, requests: int, concurrency: int) -> dict:
+    import httpx
+
+    samples = {name: [] for name in SCENARIOS}
+    errors = {name: 0 for name in SCENARIOS}
+    remaining = requests
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            scenario, method, url, body = mix.next()
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            samples[scenario].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[scenario] += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    everything = [sample for values in samples.values() for sample in values]
+    return {
+        "total": summarize(everything, elapsed, sum(errors.values())),
+        "scenarios": {
+            name: summarize(values, elapsed, errors[name])
+            for name, values in samples.items()
+        },
+    }
+
+
+async def benchmark(args) -> dict:
+    from main import app
+    from core.cache import listing_cache
+
+    results = {}
+    for size in args.sizes:
+        load_inventory(size, args.seed)
+        async with app.router.lifespan_context(app):
+            mix = RequestMix(size, args.seed)
+            # Calentamiento: compila consultas y llena las cachés de SQLite
+            await run_load(app, mix, min(args.requests, 200), args.concurrency)
+            before = listing_cache.stats()
+            result = await run_load(app, mix, args.requests, args.concurrency)
+            after = listing_cache.stats()
+            hits = after["hits"] - before["hits"]
+            lookups = hits + after["misses"] - before["misses"]
+            result["listing_cache_hit_ratio"] = (
+                round(hits / lookups, 4) if lookups else 0.0
+            )
+            results[str(size)] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Carga sobre GET /cars y POST /contact con la app en el mismo proceso."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1000, 10000],
+        help="Tamaños del inventario separados por coma (p. ej. 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="Solicitudes por tamaño"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Solicitudes simultáneas"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Semilla aleatoria")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Desactiva la caché de listados"
+    )
+    parser.add_argument(
+        "--database-url",
+        default="",
+        help="Base a usar (por defecto un SQLite temporal)",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="Archivo del reporte JSON ('-' = stdout)"
+    )
+    args = parser.parse_args()
+
+    prepare_backend(args.database_url, cache=not args.no_cache)
+    results = asyncio.run(benchmark(args))
+    report = {
+        "benchmark": "load",
+        "meta": metadata(
+            requests=args.requests,
+            concurrency=args.concurrency,
+            seed=args.seed,
+            cache=not args.no_cache,
+            scenarios=SCENARIOS,
+        ),
+        "results": results,
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import time
+from common import (
+    BACKEND_DIR,
+    load_inventory,
+    metadata,
+    prepare_backend,
+    summarize,
+    write_report,
+)
+
+IMAGES_DIR = BACKEND_DIR / "static" / "tests"
+
+
+async def bench_get_cars(sizes: list[int], repeat: int, seed: int) -> dict:
+    """
+    Mide por separado la consulta de `CarController.get_cars` (incluye armar
+    los registros de respuesta) y su serialización a JSON.
+    """
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    from controllers.car import CarController
+    from core import db
+    from core.serialization import dumps
+    from models.car import CarFilters
+
+    cases = {
+        "limit_20": (CarFilters(), 20),
+        "limit_100": (CarFilters(), 100),
+        "limit_1000": (CarFilters(), 1000),
+        "search_limit_100": (CarFilters(search="toyota cor"), 100),
+        "brand_year_limit_100": (CarFilters(brand="Ford", year_min=2015), 100),
+    }
+    results = {}
+    for size in sizes:
+        load_inventory(size, seed)
+        results[str(size)] = {}
+        for name, (filters, limit) in cases.items():
+            query_samples, serialize_samples = [], []
+            for _ in range(repeat):
+                # Una sesión por consulta, como en cada solicitud
+                async with AsyncSession(db.async_read_engine) as session:
+                    started = time.perf_counter()
+                    page = await CarController.get_cars(session, filters, 0, limit)
+                    query_samples.append(time.perf_counter() - started)
+                started = time.perf_counter()
+                dumps(page)
+                serialize_samples.append(time.perf_counter() - started)
+            results[str(size)][name] = {
+                "items": len(page["items"]),
+                "query": summarize(query_samples, sum(query_samples)),
+                "serialize": summarize(serialize_samples, sum(serialize_samples)),
+            }
+        await db.dispose_engines()
+    return results
+
+
+def bench_similar(sizes: list[int], repeat: int, k: int, seed: int) -> dict:
+    """
+    Mide la reconstrucción del índice de similares, las búsquedas en memoria
+    (sin la caché de respuestas) y las actualizaciones de una fila.
+    """
+    import random
+    from sqlmodel import Session, select
+    from controllers.car import CarController
+    from core import db
+    from core.similarity import similarity_index
+    from models.car import Car
+
+    rng = random.Random(seed)
+    results = {}
+    for size in sizes:
+        load_inventory(size, seed)
+        with Session(db.engine) as session:
+            started = time.perf_counter()
+            CarController.rebuild_similarity_index(session)
+            rebuild = time.perf_counter() - started
+            codes = list(similarity_index._codes)
+            cars = [
+                CarController._similarity_record(car)
+                for car in session.exec(
+                    select(Car).where(Car.id.in_(rng.sample(range(1, size + 1), 10)))
+                )
+            ]
+        query_samples, upsert_samples, remove_samples = [], [], []
+        for _ in range(repeat):
+            code = rng.choice(codes)
+            started = time.perf_counter()
+            similarity_index.similar(code, k)
+            query_samples.append(time.perf_counter() - started)
+        for car in cars:
+            started = time.perf_counter()
+            similarity_index.remove(car["id"])
+            remove_samples.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            similarity_index.upsert(car)
+            upsert_samples.append(time.perf_counter() - started)
+        results[str(size)] = {
+            "rebuild_ms": round(rebuild * 1000, 3),
+            "query": summarize(query_samples, sum(query_samples)),
+            "upsert": summarize(upsert_samples, sum(upsert_samples)),
+            "remove": summarize(remove_samples, sum(remove_samples)),
+        }
+        db.engine.dispose()
+    return results
+
+
+def bench_save_image(workdir, repeat: int, limit: int) -> dict:
+    """Mide `_save_image_to_file` (imagen principal y variantes) por archivo"""
+    from controllers.car import CarController
+    from core.config import AppConfig
+
+    # Las imágenes se escriben en el directorio temporal, no en static/data
+    AppConfig.IMAGES_DIR = str(workdir / "images")
+    results = {}
+    for path in sorted(IMAGES_DIR.glob("*.jpg"))[:limit]:
+        content = path.read_bytes()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            CarController._save_image_to_file(content, f"{path.stem}.webp")
+            samples.append(time.perf_counter() - started)
+        results[path.name] = {
+            "bytes": len(content),
+            **summarize(samples, sum(samples)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks de get_cars (consulta y serialización) e imágenes."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=[1000, 10000],
+        help="Tamaños del inventario separados por coma (p. ej. 1000,10000,100000)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=50, help="Repeticiones de cada consulta"
+    )
+    parser.add_argument(
+        "--similar-sizes",
+        type=lambda value: [int(size) for size in value.split(",") if size],
+        default=[10000, 100000],
+        help="Tamaños del inventario para el índice de similares ('' = ninguno)",
+    )
+    parser.add_argument(
+        "--similar-k", type=int, default=10, help="Vehículos similares por búsqueda"
+    )
+    parser.add_argument(
+        "--image-repeat", type=int, default=3, help="Repeticiones por imagen"
+    )
+    parser.add_argument(
+        "--images", type=int, default=13, help="Cantidad de imágenes (0 = ninguna)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Semilla aleatoria")
+    parser.add_argument(
+        "--database-url",
+        default="",
+        help="Base a usar (por defecto un SQLite temporal)",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="Archivo del reporte JSON ('-' = stdout)"
+    )
+    args = parser.parse_args()
+
+    workdir = prepare_backend(args.database_url)
+    report = {
+        "benchmark": "micro",
+        "meta": metadata(
+            repeat=args.repeat,
+            image_repeat=args.image_repeat,
+            similar_k=args.similar_k,
+            seed=args.seed,
+        ),
+        "get_cars": asyncio.run(bench_get_cars(args.sizes, args.repeat, args.seed)),
+        "similar": bench_similar(
+            args.similar_sizes, args.repeat, args.similar_k, args.seed
+        ),
+        "save_image": bench_save_image(workdir, args.image_repeat, args.images),
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+from common import (
+    BACKEND_DIR,
+    load_inventory,
+    metadata,
+    percentile,
+    prepare_backend,
+    summarize,
+    write_report,
+)
+
+# Proceso nuevo: importa la app, corre el inicio (lifespan) y hace la primera
+# solicitud directamente por ASGI, sin servidor ni cliente HTTP (que sumarían
+# sus propios imports). Imprime los instantes de cada etapa.
+CHILD = """
+import asyncio, json, time
+started = time.time()
+import main
+imported = time.time()
+
+async def first_request():
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/cars",
+        "raw_path": b"/cars",
+        "query_string": b"limit=20",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    await main.app(scope, receive, send)
+    return status
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        ready = time.time()
+        status = await first_request()
+        answered = time.time()
+    return ready, answered, status
+
+ready, answered, status = asyncio.run(run())
+print(json.dumps({"started": started, "imported": imported, "ready": ready,
+                  "answered": answered, "status": status}))
+"""
+
+
+def parse_importtime(output: str) -> dict[str, float]:
+    """
+    Tiempo propio (en segundos) de cada paquete de primer nivel importado por
+    `main`, según `python -X importtime`. Se suma el de todos sus módulos, así
+    no depende de qué módulo lo importó primero.
+    """
+    lines = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        # Después del separador, dos espacios por nivel de anidamiento
+        lines.append((int(self_us), name[1:].rstrip()))
+    # `import main` es la última línea sin sangría de su árbol: sus módulos
+    # son los que están entre la línea anterior sin sangría y ella
+    end = next(index for index, (_, name) in enumerate(lines) if name.strip() == "main")
+    start = end
+    while start > 0 and lines[start - 1][1].startswith(" "):
+        start -= 1
+    packages = {}
+    for self_us, name in lines[start : end + 1]:
+        package = name.strip().split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + self_us / 1_000_000
+    return packages
+
+
+def run_once() -> tuple[dict, dict[str, float]]:
+    """Inicia un proceso nuevo y devuelve sus tiempos y el costo de los imports"""
+    spawned = time.time()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"El proceso de inicio falló:\n{process.stderr}")
+    stages = json.loads(process.stdout.strip().splitlines()[-1])
+    return {
+        "interpreter": stages["started"] - spawned,
+        "import_main": stages["imported"] - stages["started"],
+        "lifespan_startup": stages["ready"] - stages["imported"],
+        "first_request": stages["answered"] - stages["ready"],
+        "first_response": stages["answered"] - spawned,
+        "errors": int(stages["status"] >= 400),
+    }, parse_importtime(process.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tiempo de inicio: imports por paquete y primera respuesta."
+    )
+    parser.add_argument(
+        "--size", type=int, default=1000, help="Vehículos en el inventario"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=10, help="Procesos que se inician"
+    )
+    parser.add_argument(
+        "--top", type=int, default=20, help="Paquetes más costosos en el reporte"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Semilla aleatoria")
+    parser.add_argument(
+        "--database-url",
+        default="",
+        help="Base a usar (por defecto un SQLite temporal)",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="Archivo del reporte JSON ('-' = stdout)"
+    )
+    args = parser.parse_args()
+
+    # Los procesos hijos heredan el entorno que arma prepare_backend
+    prepare_backend(args.database_url)
+    load_inventory(args.size, args.seed)
+
+    stages = {}
+    errors = 0
+    packages = {}
+    for _ in range(args.repeat):
+        timings, imports = run_once()
+        errors += timings.pop("errors")
+        for name, elapsed in timings.items():
+            stages.setdefault(name, []).append(elapsed)
+        for name, elapsed in imports.items():
+            packages.setdefault(name, []).append(elapsed)
+
+    # Mediana del tiempo propio de cada paquete (0 en las corridas sin él)
+    medians = {
+        name: percentile(sorted(samples + [0.0] * (args.repeat - len(samples))), 0.5)
+        for name, samples in packages.items()
+    }
+    ranking = sorted(medians.items(), key=lambda item: item[1], reverse=True)
+    report = {
+        "benchmark": "startup",
+        "meta": metadata(size=args.size, repeat=args.repeat, seed=args.seed),
+        "results": {
+            **{
+                name: summarize(
+                    samples, sum(samples), errors if name == "first_request" else 0
+                )
+                for name, samples in stages.items()
+            },
+            "imports_ms": {
+                name: round(elapsed * 1000, 3) for name, elapsed in ranking[: args.top]
+            },
+        },
+    }
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# La configuración del backend se lee al importarlo: el entorno se arma antes.
+# Por defecto se usa un SQLite temporal; TEST_DATABASE_URL corre las mismas
+# pruebas contra otra base (p. ej. PostgreSQL), que se vacía al empezar.
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='tests-')}/tests.db"
+)
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ.pop("DB_READ_REPLICA_PATH", None)
+os.environ["EMAIL_TRANSPORT"] = "fake"
+os.environ["APP_RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Cliente de la aplicación sobre una base recién creada"""
+    from fastapi.testclient import TestClient
+    from core import db
+    from main import app
+
+    db.create_db_and_tables(drop_existing=True)
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,57 @@
+import argparse
+import json
+import os
+import sys
+import requests
+
+
+def _iter_ndjson(file, chunk_size: int = 64 * 1024):
+    """Envía el archivo por partes, sin cargarlo completo en memoria"""
+    while chunk := file.read(chunk_size):
+        yield chunk
+
+
+def import_cars(path: str) -> dict:
+    host = os.getenv("APP_HOST", "localhost")
+    port = int(os.getenv("APP_PORT", 8000))
+    url = f"http://{host}:{port}/cars/bulk"
+    file = sys.stdin.buffer if path == "-" else open(path, "rb")
+    try:
+        if path.endswith(".json"):
+            headers = {"Content-Type": "application/json"}
+            data = file.read()
+        else:
+            headers = {"Content-Type": "application/x-ndjson"}
+            data = _iter_ndjson(file)
+        response = requests.post(url, data=data, headers=headers)
+    finally:
+        if file is not sys.stdin.buffer:
+            file.close()
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Importa vehículos desde un archivo JSON (lista) o NDJSON."
+    )
+    parser.add_argument(
+        "path", help="Archivo .json o .ndjson/.jsonl ('-' lee NDJSON de stdin)"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Muestra el resultado de cada vehículo"
+    )
+    args = parser.parse_args()
+
+    report = import_cars(args.path)
+    for item in report["items"]:
+        if args.verbose or item["status"] != "created":
+            print(json.dumps(item, ensure_ascii=False))
+    print(
+        f"Total: {report['total']}, creados: {report['created']}, "
+        f"conflictos: {report['conflicts']}, inválidos: {report['invalid']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,17 +6,23 @@ import json
 def populate_mocked_cars():
     host = os.getenv("APP_HOST", "localhost")
     port = int(os.getenv("APP_PORT", 8000))
-    url = f"http://{host}:{port}/cars/"
+    url = f"http://{host}:{port}/cars/bulk"
     headers = {"Content-Type": "application/json"}
     with open("cars.json", "r") as file:
         mocked_cars = json.load(file)
-    for car in mocked_cars:
-        response = requests.post(url, json=car, headers=headers)
-        if response.status_code == 201:
+    response = requests.post(url, json=mocked_cars, headers=headers)
+    if response.status_code != 200:
+        print(
+            f"Failed to import cars. Status code: {response.status_code}, Response: {response.text}"
+        )
+        return
+    for item in response.json()["items"]:
+        car = mocked_cars[item["index"]]
+        if item["status"] == "created":
             print(f"Car {car['brand']} {car['model']} created successfully.")
         else:
             print(
-                f"Failed to create car {car['brand']} {car['model']}. Status code: {response.status_code}, Response: {response.text}"
+                f"Failed to create car {car['brand']} {car['model']}. Status: {item['status']}, Error: {item['error']}"
             )
 
 
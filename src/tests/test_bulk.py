@@ -0,0 +1,63 @@
+CAR = {
+    "brand": "Dacia",
+    "description": "Vehículo de prueba de importación.",
+    "price": 21_000_000,
+    "km": 10_000,
+    "year": 2023,
+}
+
+
+def bulk(client, models: list[str]) -> list[dict]:
+    response = client.post("/cars/bulk", json=[{**CAR, "model": m} for m in models])
+    assert response.status_code == 200, response.text
+    return response.json()["items"]
+
+
+def statuses(items: list[dict]) -> list[str]:
+    return [item["status"] for item in items]
+
+
+def delete(client, items: list[dict]):
+    for item in items:
+        if item["status"] == "created":
+            client.delete(f"/cars/{item['id']}")
+
+
+def test_duplicate_inside_a_batch(client):
+    items = bulk(client, ["Duster", "Duster"])
+    assert statuses(items) == ["created", "conflict"]
+    delete(client, items)
+
+
+def test_duplicate_of_an_existing_car(client):
+    existing = bulk(client, ["Sandero"])
+    items = bulk(client, ["Logan", "Sandero"])
+    assert statuses(items) == ["created", "conflict"]
+    delete(client, existing + items)
+
+
+def test_car_created_by_another_process_during_the_batch(client, monkeypatch):
+    from sqlmodel import Session
+    from controllers.car import CarController
+    from core import db
+    from models.car import CarCreate
+
+    bump_revision = CarController._bump_revision
+    concurrent = []
+
+    async def bump_after_a_concurrent_insert(session):
+        # Otro proceso crea el mismo código después de la consulta del lote
+        if not concurrent:
+            with Session(db.engine) as other:
+                car = CarController._build_car(CarCreate(**CAR, model="Spring"))
+                other.add(car)
+                other.commit()
+                concurrent.append({"status": "created", "id": car.id})
+        return await bump_revision(session)
+
+    monkeypatch.setattr(
+        CarController, "_bump_revision", staticmethod(bump_after_a_concurrent_insert)
+    )
+    items = bulk(client, ["Jogger", "Spring"])
+    assert statuses(items) == ["created", "conflict"]
+    delete(client, concurrent + items)
@@ -0,0 +1,29 @@
+from email.utils import format_datetime, parsedate_to_datetime
+import pytest
+
+
+def last_modified(client) -> str:
+    response = client.get("/cars")
+    assert response.status_code == 200, response.text
+    return response.headers["Last-Modified"]
+
+
+@pytest.mark.parametrize("zone", ["-0000", ""])
+def test_if_modified_since_without_zone(client, zone):
+    since = parsedate_to_datetime(last_modified(client))
+    # "Tue, 20 Oct 2026 15:00:00 -0000" o sin la zona
+    value = format_datetime(since).replace("+0000", zone).strip()
+    response = client.get("/cars", headers={"If-Modified-Since": value})
+    assert response.status_code == 304
+
+
+def test_if_modified_since_older_than_the_inventory(client):
+    response = client.get(
+        "/cars", headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00"}
+    )
+    assert response.status_code == 200
+
+
+def test_invalid_if_modified_since_is_ignored(client):
+    response = client.get("/cars", headers={"If-Modified-Since": "ayer"})
+    assert response.status_code == 200
@@ -0,0 +1,104 @@
+from datetime import timedelta
+import pytest
+
+
+def contact(client, email: str, key: str):
+    response = client.post(
+        "/contact",
+        json={
+            "contact_name": "Ana",
+            "contact_email": email,
+            "contact_message": "Hola, quiero más información.",
+        },
+        headers={"Idempotency-Key": key},
+    )
+    assert response.status_code == 202, response.text
+
+
+def outbox_keys(email: str) -> set[str]:
+    """Claves de idempotencia de los correos de confirmación enviados a `email`"""
+    from sqlmodel import Session, select
+    from core import db
+    from models.email import EmailOutbox
+
+    with Session(db.engine) as session:
+        return set(
+            session.exec(
+                select(EmailOutbox.idempotency_key).where(EmailOutbox.to_email == email)
+            ).all()
+        )
+
+
+def test_retrying_with_the_same_key_does_not_duplicate(client):
+    contact(client, "ana@example.com", "form-1")
+    contact(client, "ana@example.com", "form-1")
+    assert len(outbox_keys("ana@example.com")) == 1
+
+
+def test_idempotency_keys_are_scoped_to_the_sender(client):
+    contact(client, "bruno@example.com", "form-2")
+    contact(client, "carla@example.com", "form-2")
+    assert len(outbox_keys("bruno@example.com")) == 1
+    assert len(outbox_keys("carla@example.com")) == 1
+    assert outbox_keys("bruno@example.com") != outbox_keys("carla@example.com")
+
+
+class RecordingTransport:
+    """Registra cómo se envió cada correo (en lote o de a uno)"""
+
+    def __init__(self):
+        self.calls: list[tuple[str, list[str]]] = []
+
+    def send(self, message) -> str:
+        self.calls.append(("single", [message.idempotency_key]))
+        return f"id-{message.idempotency_key}"
+
+    def send_batch(self, messages, idempotency_key=None) -> list[str]:
+        self.calls.append(("batch", [message.idempotency_key for message in messages]))
+        return [f"id-{message.idempotency_key}" for message in messages]
+
+
+@pytest.fixture
+def dispatcher(client):
+    """Despachador propio; el de la aplicación se detiene mientras tanto"""
+    from core.outbox import EmailDispatcher, email_dispatcher
+
+    client.portal.call(email_dispatcher.stop)
+    yield EmailDispatcher(transport=RecordingTransport(), batch_size=10)
+    client.portal.call(email_dispatcher.start)
+
+
+def test_recovered_emails_are_sent_one_by_one(client, dispatcher):
+    from sqlmodel import Session
+    from core import db
+    from models.email import EmailOutbox, EmailStatus
+    from models.inventory import utc_now
+
+    due = utc_now() - timedelta(seconds=1)
+    statuses = {
+        "fresh-1": EmailStatus.PENDING,
+        "fresh-2": EmailStatus.PENDING,
+        # Quedaron en "sending" sin confirmar (p. ej. el proceso se reinició)
+        "recovered-1": EmailStatus.SENDING,
+        "recovered-2": EmailStatus.SENDING,
+    }
+    with Session(db.engine) as session:
+        for key, status in statuses.items():
+            session.add(
+                EmailOutbox(
+                    idempotency_key=key,
+                    to_email="outbox@example.com",
+                    subject="Prueba",
+                    html="<p>Prueba</p>",
+                    status=status,
+                    next_attempt_at=due,
+                )
+            )
+        session.commit()
+
+    assert client.portal.call(dispatcher.dispatch_once) == len(statuses)
+    assert sorted(dispatcher.transport.calls) == [
+        ("batch", ["fresh-1", "fresh-2"]),
+        ("single", ["recovered-1"]),
+        ("single", ["recovered-2"]),
+    ]
@@ -0,0 +1,217 @@
+import hashlib
+import io
+import pytest
+
+
+@pytest.fixture
+def images_dir(client, tmp_path, monkeypatch):
+    from core.config import AppConfig
+
+    monkeypatch.setattr(AppConfig, "IMAGES_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def image_bytes(request):
+    """Una imagen distinta para cada prueba (el registro es por contenido)"""
+    from PIL import Image
+
+    color = tuple(hashlib.sha256(request.node.name.encode()).digest()[:3])
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def process(image_bytes: bytes) -> str:
+    from controllers.car import CarController
+    from core.images import ImageJob
+
+    job = ImageJob(car_id=0, code="prueba", source="http://example.com/auto.png")
+    filename, _ = CarController._process_image(job, image_bytes)
+    return filename
+
+
+def refcount(filename: str):
+    from sqlmodel import Session
+    from core import db
+    from models.image import ImageBlob
+
+    with Session(db.engine) as session:
+        blob = session.get(ImageBlob, filename)
+        return blob.refcount if blob else None
+
+
+def test_refcount_is_shared_between_cars(images_dir, image_bytes):
+    from controllers.car import CarController
+
+    # Dos vehículos con la misma foto comparten los archivos
+    filename = process(image_bytes)
+    assert process(image_bytes) == filename
+    assert refcount(filename) == 2
+
+    CarController._release_image(filename)
+    assert refcount(filename) == 1
+    assert (images_dir / filename).exists()
+
+    CarController._release_image(filename)
+    assert refcount(filename) is None
+    assert not (images_dir / filename).exists()
+
+
+def test_retain_after_the_last_release_recreates_the_files(images_dir, image_bytes):
+    from controllers.car import CarController
+
+    filename = process(image_bytes)
+    # La última referencia se libera (se borra el registro y los archivos)
+    # justo antes de que otro vehículo tome la misma imagen
+    CarController._release_image(filename)
+    assert not (images_dir / filename).exists()
+
+    assert CarController._retain_image(filename) is None
+    assert refcount(filename) == 1
+    CarController._release_image(filename)
+
+    assert process(image_bytes) == filename
+    assert (images_dir / filename).exists()
+    assert refcount(filename) == 1
+
+
+def test_attaching_to_a_deleted_car_releases_the_image(images_dir, image_bytes):
+    from controllers.car import CarController
+    from core.images import ImageJob
+
+    filename = process(image_bytes)
+    job = ImageJob(car_id=999_999, code="borrado", source="http://example.com/a.png")
+    CarController._attach_image(job, (filename, {}), None)
+    assert refcount(filename) is None
+    assert not (images_dir / filename).exists()
+
+
+def test_a_failed_attach_releases_the_image(
+    client, images_dir, image_bytes, monkeypatch
+):
+    from sqlmodel import Session
+    from controllers.car import CarController
+    from core import db
+    from core.images import ImageJob
+    from models.car import Car
+
+    car = {
+        "brand": "Fiat",
+        "model": "Cronos",
+        "description": "Vehículo de prueba de imágenes.",
+        "price": 20_000_000,
+        "km": 0,
+        "year": 2024,
+    }
+    response = client.post("/cars", json=car)
+    assert response.status_code == 200, response.text
+    car_id = response.json()["items"][0]["id"]
+    source = "http://example.com/cronos.png"
+    with Session(db.engine) as session:
+        car = session.get(Car, car_id)
+        car.image_source = source
+        session.add(car)
+        session.commit()
+
+    def fail(session):
+        raise RuntimeError("la base no responde")
+
+    filename = process(image_bytes)
+    monkeypatch.setattr(CarController, "_bump_revision_sync", fail)
+    with pytest.raises(RuntimeError):
+        CarController._attach_image(
+            ImageJob(car_id=car_id, code="fiat-cronos", source=source),
+            (filename, {}),
+            None,
+        )
+    assert refcount(filename) is None
+    assert not (images_dir / filename).exists()
+    client.delete(f"/cars/{car_id}")
+
+
+@pytest.fixture
+def pending_cars(client):
+    """Vehículos con la imagen pendiente: sin reserva, vencida y vigente"""
+    from datetime import timedelta
+    from sqlmodel import Session
+    from core import db
+    from models.car import Car, ImageStatus
+    from models.inventory import utc_now
+
+    now = utc_now()
+    claims = {
+        "Partner": None,
+        "Rifter": now - timedelta(seconds=1),
+        "Expert": now + timedelta(minutes=5),
+    }
+    ids = {}
+    for model, claimed_until in claims.items():
+        response = client.post(
+            "/cars",
+            json={
+                "brand": "Peugeot",
+                "model": model,
+                "description": "Vehículo de prueba de imágenes.",
+                "price": 19_000_000,
+                "km": 0,
+                "year": 2023,
+            },
+        )
+        assert response.status_code == 200, response.text
+        car_id = response.json()["items"][0]["id"]
+        with Session(db.engine) as session:
+            car = session.get(Car, car_id)
+            car.image_source = f"http://example.com/{car_id}.png"
+            car.image_status = ImageStatus.PENDING
+            car.image_claimed_until = claimed_until
+            session.add(car)
+            session.commit()
+        ids[model] = car_id
+    yield ids
+    for car_id in ids.values():
+        client.delete(f"/cars/{car_id}")
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Trabajos que se encolan (sin procesarlos)"""
+    from controllers.car import image_pipeline
+
+    jobs = []
+    monkeypatch.setattr(image_pipeline, "submit", jobs.append)
+    return jobs
+
+
+def resume():
+    from sqlmodel import Session
+    from controllers.car import CarController
+    from core import db
+
+    with Session(db.engine) as session:
+        CarController.resume_pending_images(session)
+
+
+def test_only_unclaimed_pending_images_are_resumed(pending_cars, submitted):
+    resume()
+    resumed = {job.car_id for job in submitted}
+    assert pending_cars["Partner"] in resumed
+    assert pending_cars["Rifter"] in resumed
+    assert pending_cars["Expert"] not in resumed
+
+    # Ya quedaron reservadas: otro proceso no las vuelve a encolar
+    submitted.clear()
+    resume()
+    assert not {job.car_id for job in submitted} & set(pending_cars.values())
+
+
+def test_released_claims_can_be_resumed(pending_cars, submitted):
+    from controllers.car import CarController
+
+    resume()
+    jobs = [job for job in submitted if job.car_id in pending_cars.values()]
+    # El proceso que las tenía se apagó sin procesarlas
+    CarController.release_image_claims(jobs)
+    submitted.clear()
+    resume()
+    assert {job.car_id for job in submitted} >= {job.car_id for job in jobs}
@@ -0,0 +1,95 @@
+import pytest
+
+# Vehículos de prueba: las palabras buscadas aparecen en la marca, el modelo o
+# solo en la descripción, con y sin acentos
+CARS = (
+    ("Volkswagen", "Amarok", "Pickup con motor diésel y tracción integral."),
+    ("Peugeot", "208", "Hatchback económico, ideal para la ciudad."),
+    ("Toyota", "Corolla", "Sedán confiable y cómodo para viajes largos."),
+    ("Ford", "Ranger", "Camioneta diesel, rival directa de la Toyota Hilux."),
+    ("Toyota", "Hilux", "Pickup robusta para el trabajo y el campo."),
+)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cars(client):
+    payload = [
+        {
+            "brand": brand,
+            "model": model,
+            "description": description,
+            "price": 20_000_000,
+            "km": 0,
+            "year": 2024,
+        }
+        for brand, model, description in CARS
+    ]
+    response = client.post("/cars/bulk", json=payload)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def search(client, text: str) -> list[str]:
+    response = client.get("/cars", params={"search": text})
+    assert response.status_code == 200, response.text
+    return [car["code"] for car in response.json()["items"]]
+
+
+@pytest.mark.parametrize("text", ["diesel", "diésel", "DIÉSEL", "Diesel"])
+def test_accents_and_case_are_ignored_in_the_query(client, text):
+    assert sorted(search(client, text)) == ["ford-ranger", "volkswagen-amarok"]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [("economico", "peugeot-208"), ("sedan", "toyota-corolla")],
+)
+def test_accents_are_ignored_in_the_document(client, text, expected):
+    assert search(client, text) == [expected]
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("amar", ["volkswagen-amarok"]),
+        ("volks", ["volkswagen-amarok"]),
+        ("toy cor", ["toyota-corolla"]),
+        ("cor toy", ["toyota-corolla"]),
+    ],
+)
+def test_every_word_matches_by_prefix(client, text, expected):
+    assert search(client, text) == expected
+
+
+def test_every_word_must_match(client):
+    assert search(client, "toyota pickup") == ["toyota-hilux"]
+    assert search(client, "toyota zzz") == []
+
+
+def test_brand_and_model_rank_above_description(client):
+    # "Toyota" está en la marca de dos vehículos y en la descripción del Ranger
+    codes = search(client, "toyota")
+    assert sorted(codes[:2]) == ["toyota-corolla", "toyota-hilux"]
+    assert codes[2:] == ["ford-ranger"]
+    # "Hilux" es el modelo de uno y solo se menciona en la descripción del otro
+    assert search(client, "hilux") == ["toyota-hilux", "ford-ranger"]
+
+
+def test_text_without_words_does_not_filter(client):
+    assert search(client, "¡¿!?") == search(client, "")
+
+
+def test_updates_are_searchable(client, cars):
+    amarok = next(car for car in cars["items"] if car["code"] == "volkswagen-amarok")
+    changes = {
+        "brand": "Volkswagen",
+        "model": "Amarok",
+        "description": "Pickup naftera con caja automática.",
+        "price": 20_000_000,
+        "km": 0,
+        "year": 2024,
+    }
+    response = client.put(f"/cars/{amarok['id']}", json=changes)
+    assert response.status_code == 200, response.text
+    assert search(client, "diesel") == ["ford-ranger"]
+    assert search(client, "naftera automatica") == ["volkswagen-amarok"]
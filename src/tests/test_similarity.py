@@ -0,0 +1,68 @@
+CAR = {
+    "brand": "Renault",
+    "model": "Kangoo",
+    "description": "Utilitario con puerta lateral.",
+    "price": 18_000_000,
+    "km": 30_000,
+    "year": 2022,
+}
+
+
+def inventory_revision() -> int:
+    from sqlmodel import Session
+    from core import db
+    from models.inventory import Inventory
+
+    with Session(db.engine) as session:
+        return session.get(Inventory, 1).revision
+
+
+def record(car_id: int, code: str, price: int) -> dict:
+    return {"id": car_id, "code": code, "price": price, "km": 0, "year": 2024}
+
+
+def test_bulk_without_new_cars(client):
+    response = client.post("/cars/bulk", json=[{**CAR, "model": "Master"}])
+    assert response.status_code == 200, response.text
+    # Todos repetidos: no se crea ninguno
+    response = client.post("/cars/bulk", json=[{**CAR, "model": "Master"}])
+    assert response.status_code == 200, response.text
+    assert [item["status"] for item in response.json()["items"]] == ["conflict"]
+
+
+def test_local_changes_do_not_require_a_rebuild(client):
+    from core.similarity import similarity_index
+
+    # La primera consulta espera a que termine la construcción inicial
+    response = client.get("/cars/renault-master/similar")
+    assert response.status_code == 200, response.text
+
+    response = client.post("/cars", json=CAR)
+    assert response.status_code == 200, response.text
+    car = response.json()["items"][0]
+    responses = [
+        client.put(f"/cars/{car['id']}", json={**CAR, "price": 17_500_000}),
+        client.post("/cars/bulk", json=[{**CAR, "model": "Trafic"}]),
+        client.delete(f"/cars/{car['id']}"),
+    ]
+    assert all(response.is_success for response in responses)
+
+    revision = inventory_revision()
+    assert similarity_index.revision == revision
+    assert not similarity_index.should_refresh(revision)
+
+
+def test_missing_revisions_wait_for_a_rebuild():
+    from core.similarity import SimilarityIndex
+
+    index = SimilarityIndex()
+    index.rebuild([record(1, "a", 100)], revision=5)
+    # La revisión 6 la hizo otro proceso: el índice no la refleja
+    index.upsert(record(2, "b", 200), revision=7)
+    assert index.revision == 5
+    index.remove(1, revision=6)
+    assert index.revision == 7
+    # Un lote vacío no cambia el índice
+    index.upsert_many([], revision=8)
+    assert index.revision == 8
+    assert len(index) == 1